@@ -0,0 +1,88 @@
+"""Накладные расходы сессии и пользователя на запрос follow_index.
+
+Сравниваются сессии в базе с ModelBackend, сессии в базе с
+users.backends.CachedModelBackend (настройка проекта) и cached_db-сессии,
+допустимые только при общем для процессов бэкенде кеша. Лента подписок
+сама кешируется (posts.feed_cache), поэтому после первого запроса время
+ответа — почти только стоимость middleware и чтения поколения ленты.
+
+Запуск из корня репозитория: python -m benchmarks.bench_session
+"""
+from benchmarks.utils import report, setup_django, timeit
+
+REPEAT = 500
+AUTHORS = 20
+
+CONFIGS = (
+    ('db + ModelBackend', {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+        'AUTHENTICATION_BACKENDS': [
+            'django.contrib.auth.backends.ModelBackend'],
+    }),
+    ('db + CachedModelBackend', {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+        'AUTHENTICATION_BACKENDS': ['users.backends.CachedModelBackend'],
+    }),
+    ('cached_db + CachedModelBackend', {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+        'AUTHENTICATION_BACKENDS': ['users.backends.CachedModelBackend'],
+    }),
+)
+
+
+def fill_database():
+    from django.contrib.auth import get_user_model
+
+    from posts.models import Follow, Post
+
+    User = get_user_model()
+    reader = User.objects.create_user(username='reader')
+    for number in range(AUTHORS):
+        author = User.objects.create_user(username=f'author{number}')
+        Follow.objects.create(user=reader, author=author)
+        Post.objects.create(author=author, text=f'Пост {number}')
+    return reader
+
+
+def measure(reader, url):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import Client
+
+    cache.clear()
+    client = Client()
+    client.force_login(reader)
+    client.get(url)
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        client.get(url)
+    return timeit(lambda: client.get(url), REPEAT), len(queries)
+
+
+def main():
+    setup_django()
+    from django.db import connection
+    from django.test.utils import (override_settings,
+                                   setup_test_environment)
+
+    from posts.url_builder import fast_url
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    reader = fill_database()
+    url = fast_url('posts:follow_index')
+    rows = []
+    for name, overrides in CONFIGS:
+        with override_settings(**overrides):
+            elapsed, queries = measure(reader, url)
+        rows.append((f'{name} ({queries} запр.)', elapsed))
+    report(f'follow_index авторизованным, среднее из {REPEAT}', rows)
+
+
+if __name__ == '__main__':
+    main()
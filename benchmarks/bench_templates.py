@@ -0,0 +1,88 @@
+"""Рендер ленты без кеша шаблонов и с предкомпиляцией.
+
+Запуск из корня репозитория: python -m benchmarks.bench_templates
+"""
+import datetime
+import time
+from types import SimpleNamespace
+
+from benchmarks.utils import report, setup_django, timeit
+
+REPEAT = 200
+FEED_TEMPLATE = 'posts/index.html'
+
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+def make_backend(cached):
+    from django.conf import settings
+    from django.template.backends.django import DjangoTemplates
+
+    loaders = LOADERS
+    if cached:
+        loaders = [('django.template.loaders.cached.Loader', LOADERS)]
+    return DjangoTemplates({
+        'NAME': 'bench',
+        'DIRS': [settings.TEMPLATES_DIR],
+        'APP_DIRS': False,
+        'OPTIONS': {'loaders': loaders},
+    })
+
+
+class Author(SimpleNamespace):
+    def __str__(self):
+        return self.username
+
+
+def feed_context():
+    from django.core.paginator import Paginator
+
+    author = Author(username='author', get_full_name='Author')
+    posts = [
+        SimpleNamespace(pk=i, text='Текст поста', author=author,
+                        pub_date=datetime.datetime(2023, 1, 1),
+                        image=None, group=None)
+        for i in range(1, 101)
+    ]
+    return {'page_obj': Paginator(posts, 10).get_page(1)}
+
+
+def render(backend, context):
+    return backend.get_template(FEED_TEMPLATE).render(context)
+
+
+def first_render(cached, context):
+    from core.template_cache import precompile_templates
+
+    backend = make_backend(cached)
+    start = time.perf_counter()
+    if cached:
+        precompile_templates([backend])
+    startup = time.perf_counter() - start
+    start = time.perf_counter()
+    render(backend, context)
+    first = time.perf_counter() - start
+    return backend, startup * 1000, first * 1000
+
+
+def main():
+    setup_django()
+    context = feed_context()
+    plain, _, plain_first = first_render(False, context)
+    cached, startup, cached_first = first_render(True, context)
+    report(f'{FEED_TEMPLATE}, {REPEAT} рендеров', [
+        ('filesystem: первый запрос', plain_first),
+        ('filesystem: установившийся рендер',
+         timeit(lambda: render(plain, context), REPEAT)),
+        ('cached: предкомпиляция при старте', startup),
+        ('cached: первый запрос', cached_first),
+        ('cached: установившийся рендер',
+         timeit(lambda: render(cached, context), REPEAT)),
+    ])
+
+
+if __name__ == '__main__':
+    main()
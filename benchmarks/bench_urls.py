@@ -0,0 +1,32 @@
+"""reverse() против posts.url_builder.fast_url для маршрутов ленты.
+
+Запуск из корня репозитория: python -m benchmarks.bench_urls
+"""
+from benchmarks.utils import report, setup_django, timeit
+
+REPEAT = 20000
+ROUTES = (
+    ('posts:profile', 'leo'),
+    ('posts:post_detail', 12345),
+    ('posts:group_posts', 'cats'),
+)
+
+
+def main():
+    setup_django()
+    from django.urls import reverse
+
+    from posts.url_builder import fast_url
+
+    rows = []
+    for viewname, arg in ROUTES:
+        assert fast_url(viewname, arg) == reverse(viewname, args=[arg])
+        rows.append((f'reverse {viewname}',
+                     timeit(lambda: reverse(viewname, args=[arg]), REPEAT)))
+        rows.append((f'fast_url {viewname}',
+                     timeit(lambda: fast_url(viewname, arg), REPEAT)))
+    report(f'Построение адреса, среднее из {REPEAT}', rows)
+
+
+if __name__ == '__main__':
+    main()
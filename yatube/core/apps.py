@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        if getattr(settings, 'PRECOMPILE_TEMPLATES', False):
+            from .template_cache import precompile_templates
+            precompile_templates()
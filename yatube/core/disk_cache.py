@@ -0,0 +1,82 @@
+import os
+import tempfile
+import threading
+import time
+
+# После вытеснения кеш занимает не больше этой доли бюджета, чтобы не
+# сканировать каталог на каждой записи.
+LOW_WATER = 0.9
+
+
+class DiskCache:
+    """Файлы в каталоге root с бюджетом в байтах.
+
+    Время последнего чтения — atime файла, get выставляет его явно, не
+    полагаясь на настройки монтирования; mtime не меняется, и ETag
+    файла остаётся прежним. Когда записанное превышает бюджет,
+    удаляются давно не читавшиеся файлы. Размер каталога процесс знает
+    приблизительно и уточняет при вытеснении.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.size = None
+        self.lock = threading.Lock()
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def get(self, key):
+        """Путь к файлу для key или None.
+
+        Другой процесс может вытеснить файл до того, как его откроют:
+        FileNotFoundError при открытии надо считать промахом.
+        """
+        path = self.path(key)
+        try:
+            stat = os.stat(path)
+            os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+        except FileNotFoundError:
+            return None
+        return path
+
+    def set(self, key, data):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        os.replace(temp_path, path)
+        with self.lock:
+            if self.size is None:
+                self.size = sum(size for _, size, _ in self.entries())
+            else:
+                self.size += len(data)
+            if self.size > self.max_bytes:
+                self.evict()
+        return path
+
+    def entries(self):
+        """(atime, размер, путь) для всех файлов кеша."""
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield stat.st_atime, stat.st_size, path
+
+    def evict(self):
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes * LOW_WATER:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self.size = total
@@ -0,0 +1,61 @@
+"""Кеширование страницы с «дырками» под пользовательские фрагменты.
+
+Страница кешируется один раз для всех. Фрагменты, зависящие от
+пользователя (шапка, переключатель лент), при рендере для кеша
+заменяются маркерами тега {% fragment %} и дорисовываются на каждый
+запрос. Подделать маркер через пользовательский текст нельзя: «<» в
+нём экранируется автоэкранированием шаблонов.
+"""
+import hashlib
+import re
+from functools import wraps
+
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+
+from . import swr
+
+MARKER = '<!--fragment:{}-->'
+MARKER_RE = re.compile(r'<!--fragment:([\w/.\-]+)-->')
+
+
+def fill_fragments(request, content):
+    return MARKER_RE.sub(
+        lambda match: render_to_string(match.group(1), request=request),
+        content,
+    )
+
+
+def cache_page_with_fragments(timeout, key_prefix, stale_timeout=0):
+    """Как cache_page, но общий для всех пользователей кеш страницы.
+
+    После timeout страница ещё stale_timeout секунд отдаётся устаревшей,
+    пока один процесс строит новую (см. core.swr).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            response = None
+
+            def generate():
+                nonlocal response
+                request.defer_fragments = True
+                response = view(request, *args, **kwargs)
+                if response.streaming or response.status_code != 200:
+                    return None
+                return response.content.decode(response.charset)
+
+            content = swr.get_or_generate(
+                f'fragments:{key_prefix}:{path}', generate,
+                timeout, stale_timeout, key_prefix)
+            if response is None:
+                return HttpResponse(fill_fragments(request, content))
+            if not response.streaming:
+                response.content = fill_fragments(
+                    request, response.content.decode(response.charset))
+            return response
+        return wrapper
+    return decorator
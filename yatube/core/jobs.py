@@ -0,0 +1,132 @@
+"""Очередь отложенных задач в таблице базы данных.
+
+Задача — функция, доступная по пути импорта, и аргументы в JSON.
+enqueue пишет строку в той же транзакции, что и запрос, поэтому задача
+не потеряется и не выполнится для откатившихся изменений. Исполнители
+(команда run_jobs) забирают задачи по убыванию приоритета: строка
+переводится в running условным UPDATE, и одну задачу не возьмут двое.
+Упавшая задача возвращается в очередь с экспоненциальной задержкой,
+после max_attempts попыток остаётся в статусе failed. Задача, чей
+исполнитель умер, считается брошенной через RUNNING_TIMEOUT и снова
+попадает в очередь.
+"""
+import datetime
+import json
+import logging
+import time
+import traceback
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import OperationalError
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE = 10
+BACKOFF_MAX = 60 * 60
+RUNNING_TIMEOUT = 60 * 15
+CLAIM_ATTEMPTS = 5
+LOCKED_ATTEMPTS = 20
+LOCKED_PAUSE = 0.05
+
+
+def enqueue(func, *args, priority=0, delay=0, max_attempts=5, **kwargs):
+    """Ставит func(*args, **kwargs) в очередь; аргументы — JSON."""
+    name = func if isinstance(func, str) else (
+        f'{func.__module__}.{func.__qualname__}')
+    return Job.objects.create(
+        name=name,
+        payload=json.dumps({'args': args, 'kwargs': kwargs},
+                           cls=DjangoJSONEncoder),
+        priority=priority,
+        max_attempts=max_attempts,
+        run_at=timezone.now() + datetime.timedelta(seconds=delay),
+    )
+
+
+def backoff(attempts):
+    return min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+
+
+def ready_jobs(now):
+    abandoned = now - datetime.timedelta(seconds=RUNNING_TIMEOUT)
+    return Job.objects.filter(
+        Q(status=Job.QUEUED, run_at__lte=now)
+        | Q(status=Job.RUNNING, started_at__lt=abandoned)
+    ).order_by('-priority', 'run_at', 'id')
+
+
+def retry_locked(func, *args, **kwargs):
+    """func(), повторённая, пока SQLite занят записью другого процесса."""
+    for attempt in range(LOCKED_ATTEMPTS):
+        try:
+            return func(*args, **kwargs)
+        except OperationalError as error:
+            if 'locked' not in str(error) or attempt == LOCKED_ATTEMPTS - 1:
+                raise
+            time.sleep(LOCKED_PAUSE)
+
+
+def claim(worker):
+    """Следующая готовая задача, уже помеченная как running, или None."""
+    return retry_locked(_claim, worker)
+
+
+def _claim(worker):
+    for _ in range(CLAIM_ATTEMPTS):
+        now = timezone.now()
+        job = ready_jobs(now).only('id', 'status', 'started_at').first()
+        if job is None:
+            return None
+        # started_at в условии: брошенную задачу, которую уже забрал
+        # другой исполнитель, второй раз не захватить.
+        taken = Job.objects.filter(
+            id=job.id, status=job.status, started_at=job.started_at,
+        ).update(
+            status=Job.RUNNING,
+            started_at=now,
+            worker=worker,
+            attempts=F('attempts') + 1,
+        )
+        if taken:
+            return Job.objects.get(id=job.id)
+    return None
+
+
+def run(job):
+    """Выполняет захваченную задачу и записывает результат."""
+    payload = json.loads(job.payload)
+    try:
+        import_string(job.name)(*payload['args'], **payload['kwargs'])
+    except Exception:
+        logger.exception('Job %s failed', job)
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + datetime.timedelta(
+                seconds=backoff(job.attempts))
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+    else:
+        job.status = Job.DONE
+        job.finished_at = timezone.now()
+    retry_locked(job.save, update_fields=['status', 'run_at',
+                                          'finished_at', 'last_error'])
+    return job.status == Job.DONE
+
+
+def run_pending(worker='inline', limit=None):
+    """Выполняет готовые задачи в текущем потоке; число выполненных."""
+    done = 0
+    while limit is None or done < limit:
+        job = claim(worker)
+        if job is None:
+            break
+        run(job)
+        done += 1
+    return done
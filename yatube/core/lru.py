@@ -0,0 +1,54 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Кеш байтовых строк в памяти процесса с бюджетом в байтах.
+
+    При превышении бюджета вытесняются давно не читавшиеся записи.
+    Если задан timeout, запись живёт не дольше timeout секунд.
+    """
+
+    def __init__(self, max_bytes, timeout=None):
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self.entries[key]
+                self.size -= len(value)
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        expires = (None if self.timeout is None
+                   else time.monotonic() + self.timeout)
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[0])
+            self.entries[key] = (value, expires)
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, (evicted, _) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self.entries)
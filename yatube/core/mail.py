@@ -0,0 +1,162 @@
+"""Отправка почты через очередь.
+
+QueuedEmailBackend сохраняет письма в OutgoingEmail и сразу возвращает
+управление, а отправку ставит задачей в core.jobs. send_pending
+забирает письма пакетами и отправляет их через одно соединение
+EMAIL_DELIVERY_BACKEND (обычно SMTP), открытое на весь проход.
+"""
+import base64
+import datetime
+import json
+import logging
+import uuid
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.utils import timezone
+
+from . import jobs
+from .models import Job, OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 5
+# Письма, взятые упавшим отправителем, возвращаются в очередь.
+SENDING_TIMEOUT = 60 * 15
+
+
+def serialize(message):
+    attachments = []
+    for attachment in message.attachments:
+        # Вложения-объекты MIMEBase в очередь не попадают.
+        filename, content, mimetype = attachment
+        if isinstance(content, str):
+            content = content.encode()
+        attachments.append(
+            [filename, base64.b64encode(content).decode(), mimetype])
+    return json.dumps({
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': getattr(message, 'alternatives', []),
+        'attachments': attachments,
+        'content_subtype': message.content_subtype,
+    })
+
+
+def deserialize(payload, connection=None):
+    data = json.loads(payload)
+    message = EmailMultiAlternatives(
+        subject=data['subject'],
+        body=data['body'],
+        from_email=data['from_email'],
+        to=data['to'],
+        cc=data['cc'],
+        bcc=data['bcc'],
+        reply_to=data['reply_to'],
+        headers=data['headers'],
+        alternatives=[tuple(item) for item in data['alternatives']],
+        connection=connection,
+    )
+    message.content_subtype = data['content_subtype']
+    for filename, content, mimetype in data['attachments']:
+        message.attach(filename, base64.b64decode(content), mimetype)
+    return message
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        rows = []
+        for message in email_messages:
+            if not message.recipients():
+                continue
+            try:
+                payload = serialize(message)
+            except (TypeError, ValueError):
+                if not self.fail_silently:
+                    raise
+                continue
+            rows.append(OutgoingEmail(
+                subject=message.subject[:255],
+                recipients=', '.join(message.recipients()),
+                payload=payload,
+            ))
+        if rows:
+            OutgoingEmail.objects.bulk_create(rows)
+            schedule()
+        return len(rows)
+
+
+def schedule():
+    """Ставит send_pending в очередь, если он ещё не ждёт там."""
+    name = f'{send_pending.__module__}.{send_pending.__qualname__}'
+    if not Job.objects.filter(name=name, status=Job.QUEUED).exists():
+        jobs.enqueue(name, priority=20)
+
+
+def claim_batch(size):
+    now = timezone.now()
+    OutgoingEmail.objects.filter(
+        status=OutgoingEmail.SENDING,
+        claimed_at__lt=now - datetime.timedelta(seconds=SENDING_TIMEOUT),
+    ).update(status=OutgoingEmail.QUEUED)
+    batch = uuid.uuid4().hex
+    ids = list(OutgoingEmail.objects.filter(status=OutgoingEmail.QUEUED)
+               .order_by('id').values_list('id', flat=True)[:size])
+    OutgoingEmail.objects.filter(
+        id__in=ids, status=OutgoingEmail.QUEUED
+    ).update(status=OutgoingEmail.SENDING, batch=batch, claimed_at=now)
+    return list(OutgoingEmail.objects.filter(
+        batch=batch, status=OutgoingEmail.SENDING))
+
+
+def deliver(connection, email):
+    try:
+        connection.send_messages([deserialize(email.payload)])
+    except Exception as error:
+        logger.exception('Email %s failed', email.pk)
+        email.attempts += 1
+        email.last_error = str(error)
+        email.status = (OutgoingEmail.QUEUED
+                        if email.attempts < MAX_ATTEMPTS
+                        else OutgoingEmail.FAILED)
+        # Соединение после ошибки могло оборваться: следующее письмо
+        # откроет новое.
+        connection.close()
+        return False
+    email.status = OutgoingEmail.SENT
+    email.sent_at = timezone.now()
+    return True
+
+
+def send_pending(batch_size=BATCH_SIZE):
+    """Отправляет письма из очереди; число отправленных."""
+    connection = get_connection(settings.EMAIL_DELIVERY_BACKEND)
+    sent = 0
+    retry = False
+    with connection:
+        while True:
+            emails = claim_batch(batch_size)
+            if not emails:
+                break
+            for email in emails:
+                if deliver(connection, email):
+                    sent += 1
+                else:
+                    retry = True
+            OutgoingEmail.objects.bulk_update(
+                emails, ['status', 'attempts', 'sent_at', 'last_error'])
+            if retry:
+                # Повтор — следующей задачей, с задержкой очереди.
+                break
+    if retry:
+        jobs.enqueue(send_pending, batch_size, priority=20,
+                     delay=jobs.BACKOFF_BASE)
+    return sent
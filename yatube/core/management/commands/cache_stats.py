@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from core import swr
+
+
+class Command(BaseCommand):
+    help = ('Счётчики кеша со слиянием запросов: сколько генераций '
+            'страниц сэкономлено')
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', default=['index_page'])
+
+    def handle(self, *args, **options):
+        for name in options['names']:
+            counters = swr.metrics(name)
+            saved = counters['stale'] + counters['coalesced']
+            self.stdout.write(
+                f'{name}: ' + ', '.join(
+                    f'{counter}={value}' for counter, value
+                    in counters.items()
+                ) + f', saved={saved}'
+            )
@@ -0,0 +1,46 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from core.models import Job
+
+
+class Command(BaseCommand):
+    help = 'Состояние очереди отложенных задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--failed', action='store_true',
+                            help='Показать ошибки упавших задач')
+        parser.add_argument('--retry', action='store_true',
+                            help='Вернуть упавшие задачи в очередь')
+        parser.add_argument('--purge', type=int, metavar='DAYS',
+                            help='Удалить выполненные задачи старше DAYS')
+
+    def handle(self, *args, **options):
+        if options['retry']:
+            retried = Job.objects.filter(status=Job.FAILED).update(
+                status=Job.QUEUED, attempts=0, run_at=timezone.now())
+            self.stdout.write(f'Возвращено в очередь: {retried}')
+        if options['purge'] is not None:
+            border = timezone.now() - datetime.timedelta(
+                days=options['purge'])
+            purged, _ = Job.objects.filter(
+                status=Job.DONE, finished_at__lt=border).delete()
+            self.stdout.write(f'Удалено выполненных: {purged}')
+        rows = (Job.objects.order_by('name', 'status')
+                .values('name', 'status')
+                .annotate(count=Count('id'), oldest=Min('run_at')))
+        now = timezone.now()
+        for row in rows:
+            line = f'{row["name"]} {row["status"]}: {row["count"]}'
+            if row['status'] == Job.QUEUED:
+                wait = max((now - row['oldest']).total_seconds(), 0)
+                line += f', ждёт до {wait:.0f} с'
+            self.stdout.write(line)
+        if options['failed']:
+            for job in Job.objects.filter(status=Job.FAILED):
+                self.stdout.write(
+                    f'#{job.pk} {job.name}, попыток {job.attempts}:\n'
+                    f'{job.last_error}')
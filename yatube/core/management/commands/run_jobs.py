@@ -0,0 +1,63 @@
+import os
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+
+from core import jobs
+
+
+def work(worker, once, poll):
+    """Цикл исполнителя; с once завершается, когда очередь пуста."""
+    done = 0
+    try:
+        while True:
+            job = jobs.claim(worker)
+            if job is None:
+                if once:
+                    return done
+                time.sleep(poll)
+                continue
+            jobs.run(job)
+            done += 1
+    finally:
+        # У каждого потока своё соединение с базой.
+        connection.close()
+
+
+def work_threads(threads, once, poll):
+    prefix = f'{socket.gethostname()}:{os.getpid()}'
+    with ThreadPoolExecutor(threads) as pool:
+        return sum(pool.map(
+            lambda number: work(f'{prefix}:{number}', once, poll),
+            range(threads)))
+
+
+class Command(BaseCommand):
+    help = 'Исполнитель очереди отложенных задач core.jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=1,
+                            help='Потоков в каждом процессе')
+        parser.add_argument('--processes', type=int, default=0,
+                            help='Дочерних процессов; 0 — в этом процессе')
+        parser.add_argument('--poll', type=float, default=1.0,
+                            help='Пауза при пустой очереди, секунд')
+        parser.add_argument('--once', action='store_true',
+                            help='Выполнить готовые задачи и выйти')
+
+    def handle(self, *args, **options):
+        threads, once, poll = (options['threads'], options['once'],
+                               options['poll'])
+        processes = options['processes']
+        if processes:
+            # Дочерние процессы не должны делить соединения с родителем.
+            connections.close_all()
+            with ProcessPoolExecutor(processes) as pool:
+                done = sum(pool.map(work_threads, [threads] * processes,
+                                    [once] * processes, [poll] * processes))
+        else:
+            done = work_threads(threads, once, poll)
+        self.stdout.write(f'Выполнено задач: {done}')
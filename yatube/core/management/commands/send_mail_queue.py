@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from core import mail
+from core.models import OutgoingEmail
+
+
+class Command(BaseCommand):
+    help = ('Отправляет письма из очереди сейчас, не дожидаясь '
+            'исполнителя run_jobs')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=mail.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        sent = mail.send_pending(options['batch_size'])
+        statuses = dict(OutgoingEmail.objects.order_by()
+                        .values_list('status')
+                        .annotate(count=Count('id')))
+        self.stdout.write(f'Отправлено: {sent}, в очереди: '
+                          f'{statuses.get(OutgoingEmail.QUEUED, 0)}, '
+                          f'не отправлено: '
+                          f'{statuses.get(OutgoingEmail.FAILED, 0)}')
@@ -0,0 +1,133 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+MEDIA_MAX_AGE = 60 * 60 * 24 * 30
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """Файл, читаемый от start не дальше length байт."""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def etag_for(path):
+    stat = os.stat(path)
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """(start, end) для одного диапазона Range или None.
+
+    Несколько диапазонов не поддерживаются: файл отдаётся целиком.
+    Для невыполнимого диапазона возбуждается ValueError.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if match is None or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if not start:
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        raise ValueError('Unsatisfiable range')
+    return start, end
+
+
+def sendfile_response(path, name, content_type):
+    header = settings.MEDIA_SENDFILE_HEADER
+    response = HttpResponse(content_type=content_type)
+    if header == 'X-Accel-Redirect':
+        response[header] = settings.MEDIA_ACCEL_PREFIX + quote(name)
+    else:
+        response[header] = path
+    return response
+
+
+def file_response(request, path, size, content_type):
+    header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if header is None or (if_range and if_range != etag_for(path)):
+        return FileResponse(open(path, 'rb'), content_type=content_type)
+    try:
+        byte_range = parse_range(header, size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range is None:
+        return FileResponse(open(path, 'rb'), content_type=content_type)
+    start, end = byte_range
+    length = end - start + 1
+    response = FileResponse(RangeFile(open(path, 'rb'), start, length),
+                            content_type=content_type, status=206)
+    response['Content-Length'] = length
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
+
+
+def serve(request, path):
+    """Отдаёт файл из MEDIA_ROOT.
+
+    Поддерживает условные запросы и Range. Если задан
+    MEDIA_SENDFILE_HEADER, передача файла поручается веб-серверу.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    return serve_file(request, full_path, path)
+
+
+def serve_file(request, full_path, path=None, content_type=None):
+    """Ответ с файлом full_path с условными запросами и Range.
+
+    path — имя относительно MEDIA_ROOT для передачи веб-серверу; без
+    него файл отдаёт сам Django.
+    """
+    stat = os.stat(full_path)
+    etag = etag_for(full_path)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        content_type = (content_type
+                        or mimetypes.guess_type(full_path)[0]
+                        or 'application/octet-stream')
+        if settings.MEDIA_SENDFILE_HEADER and path is not None:
+            response = sendfile_response(full_path, path, content_type)
+        else:
+            response = file_response(request, full_path, stat.st_size,
+                                     content_type)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Accept-Ranges'] = 'bytes'
+    patch_cache_control(response, public=True, max_age=MEDIA_MAX_AGE)
+    return response
@@ -0,0 +1,57 @@
+"""Счётчики в общем кеше, по имени подсистемы.
+
+Счётчики лежат в кеше 'shared', чтобы команды вроде cache_stats видели
+сумму по всем процессам сервера. Чтобы не ходить в общий кеш на каждое
+попадание, процесс копит прибавки у себя и сбрасывает их туда не чаще
+раза в FLUSH_INTERVAL секунд.
+"""
+import threading
+import time
+from collections import Counter
+
+from django.core.cache import caches
+
+COUNTER_KEY = 'metrics:{}:{}'
+FLUSH_INTERVAL = 10
+
+_pending = Counter()
+_flushed_at = time.monotonic()
+_lock = threading.Lock()
+
+
+def _write(pending):
+    shared = caches['shared']
+    for key, amount in pending.items():
+        if shared.add(key, amount, None):
+            continue
+        try:
+            shared.incr(key, amount)
+        except ValueError:
+            # Ключ пропал между add и incr.
+            shared.set(key, amount, None)
+
+
+def flush():
+    """Сбрасывает накопленные прибавки в общий кеш."""
+    global _flushed_at
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _flushed_at = time.monotonic()
+    _write(pending)
+
+
+def incr(name, counter, amount=1):
+    with _lock:
+        _pending[COUNTER_KEY.format(name, counter)] += amount
+        due = time.monotonic() - _flushed_at >= FLUSH_INTERVAL
+    if due:
+        flush()
+
+
+def read(name, counters):
+    flush()
+    keys = {COUNTER_KEY.format(name, counter): counter
+            for counter in counters}
+    values = caches['shared'].get_many(list(keys))
+    return {counter: values.get(key, 0) for key, counter in keys.items()}
@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+
+from . import ratelimit
+from .staticfiles import scan_static_root
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+MUTABLE_MAX_AGE = 60
+
+
+class StaticFilesMiddleware:
+    """Отдаёт собранную статику до остальных middleware и view.
+
+    Файлы с хешем в имени кешируются клиентом навсегда, для клиентов
+    с поддержкой сжатия отдаются готовые варианты .br/.gz.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        if not settings.STATIC_ROOT or not self.prefix.startswith('/'):
+            raise MiddlewareNotUsed
+        self.files = scan_static_root(settings.STATIC_ROOT)
+        if not self.files:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        if (request.method in ('GET', 'HEAD')
+                and request.path_info.startswith(self.prefix)):
+            static_file = self.files.get(
+                request.path_info[len(self.prefix):])
+            if static_file is not None:
+                return self.serve(request, static_file)
+        return self.get_response(request)
+
+    def serve(self, request, static_file):
+        if request.META.get('HTTP_IF_NONE_MATCH') == static_file.etag:
+            response = HttpResponseNotModified()
+        else:
+            path, encoding = static_file.select(
+                request.META.get('HTTP_ACCEPT_ENCODING', ''))
+            response = FileResponse(open(path, 'rb'),
+                                    content_type=static_file.content_type)
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = static_file.etag
+        if static_file.immutable:
+            response['Cache-Control'] = (
+                f'public, max-age={IMMUTABLE_MAX_AGE}, immutable')
+        else:
+            response['Cache-Control'] = f'public, max-age={MUTABLE_MAX_AGE}'
+        if static_file.variants:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+class RateLimitMiddleware:
+    """Лимиты для маршрутов из settings.RATELIMITS.
+
+    Проверка выполняется до вызова view, поэтому запрос сверх лимита
+    получает 429 без валидации формы и обращений к базе.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.rules = getattr(settings, 'RATELIMITS', {})
+        if not self.rules:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_name = request.resolver_match.view_name
+        rule = self.rules.get(view_name)
+        if rule is None:
+            return None
+        return ratelimit.check(request, view_name, **rule)
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutgoingEmail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('subject', models.CharField(blank=True, max_length=255, verbose_name='Тема')),
+                ('recipients', models.TextField(verbose_name='Получатели')),
+                ('payload', models.TextField(verbose_name='Письмо в JSON')),
+                ('status', models.CharField(choices=[('queued', 'В очереди'), ('sending', 'Отправляется'), ('sent', 'Отправлено'), ('failed', 'Не отправлено')], db_index=True, default='queued', max_length=10, verbose_name='Статус')),
+                ('batch', models.CharField(blank=True, max_length=32, verbose_name='Пакет отправки')),
+                ('claimed_at', models.DateTimeField(blank=True, null=True, verbose_name='Взято в отправку')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Отправлено')),
+                ('last_error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -9,3 +9,77 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class Job(CreatedModel):
+    """Отложенная задача очереди core.jobs."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Не выполнена'),
+    )
+
+    name = models.CharField(
+        'Функция',
+        max_length=200,
+        help_text=('Путь для импорта, например '
+                   'posts.image_meta.build_thumbnail'))
+    payload = models.TextField('Аргументы в JSON', default='{}')
+    priority = models.SmallIntegerField(
+        'Приоритет',
+        default=0,
+        help_text='Задачи с большим приоритетом выполняются раньше')
+    status = models.CharField(
+        'Статус', max_length=10, choices=STATUSES, default=QUEUED)
+    run_at = models.DateTimeField('Выполнить не раньше')
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        'Предел попыток', default=5)
+    started_at = models.DateTimeField('Начало', null=True, blank=True)
+    finished_at = models.DateTimeField('Окончание', null=True, blank=True)
+    worker = models.CharField('Исполнитель', max_length=100, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_at'],
+                         name='job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.status})'
+
+
+class OutgoingEmail(CreatedModel):
+    """Письмо, принятое core.mail.QueuedEmailBackend и ждущее отправки."""
+    QUEUED = 'queued'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (SENDING, 'Отправляется'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Не отправлено'),
+    )
+
+    subject = models.CharField('Тема', max_length=255, blank=True)
+    recipients = models.TextField('Получатели')
+    payload = models.TextField('Письмо в JSON')
+    status = models.CharField(
+        'Статус', max_length=10, choices=STATUSES, default=QUEUED,
+        db_index=True)
+    batch = models.CharField('Пакет отправки', max_length=32, blank=True)
+    claimed_at = models.DateTimeField(
+        'Взято в отправку', null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    sent_at = models.DateTimeField('Отправлено', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+
+    def __str__(self):
+        return f'{self.subject} → {self.recipients}'
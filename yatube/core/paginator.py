@@ -0,0 +1,47 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Min
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator без полного COUNT(*) по большим таблицам.
+
+    До exact_limit строк считает точно, ограниченным подзапросом.
+    Дальше для всей таблицы возвращает оценку: reltuples из статистики
+    PostgreSQL или разницу между крайними первичными ключами, которые
+    берутся по индексу. Отфильтрованный список так не оценить, для него
+    count остаётся exact_limit + 1, а truncated становится True:
+    шаблон показывает «exact_limit+» и не ссылается на последние
+    страницы.
+    """
+    exact_limit = 10000
+    truncated = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list.order_by()
+        exact = queryset[:self.exact_limit + 1].count()
+        if exact <= self.exact_limit:
+            return exact
+        if queryset.query.where or queryset.query.distinct:
+            self.truncated = True
+            return exact
+        return max(self.estimate(), exact)
+
+    def estimate(self):
+        model = self.object_list.model
+        connection = connections[self.object_list.db]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE relname = %s',
+                    [model._meta.db_table])
+                row = cursor.fetchone()
+            if row and row[0] > 0:
+                return int(row[0])
+        bounds = model._default_manager.using(self.object_list.db).aggregate(
+            first=Min('pk'), last=Max('pk'))
+        if bounds['first'] is None:
+            return 0
+        return bounds['last'] - bounds['first'] + 1
@@ -0,0 +1,141 @@
+"""Ограничение частоты запросов по алгоритму token bucket.
+
+Правило задаётся строкой вида '10/m': ведро вмещает 10 токенов и
+заполняется со скоростью 10 токенов в минуту, каждый запрос забирает
+один токен. Состояние вёдер хранится в хранилище RATELIMIT_STORAGE.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+# Вёдра, дольше всех не использовавшиеся, вытесняются сверх этого числа.
+LOCAL_MAX_BUCKETS = 10000
+LOCK_TIMEOUT = 1
+LOCK_ATTEMPTS = 20
+LOCK_WAIT = 0.005
+
+
+def parse_rate(rate):
+    """'10/m' -> (ёмкость ведра, токенов в секунду)."""
+    count, period = rate.split('/')
+    count = int(count)
+    return count, count / PERIODS[period]
+
+
+class LocalStorage:
+    """Вёдра в памяти процесса, не больше LOCAL_MAX_BUCKETS."""
+
+    def __init__(self, max_buckets=LOCAL_MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def consume(self, key, capacity, refill):
+        with self.lock:
+            state, retry_after = take_token(self.buckets.pop(key, None),
+                                            capacity, refill)
+            self.buckets[key] = state
+            while len(self.buckets) > self.max_buckets:
+                # Давно не тронутое ведро успело наполниться, забыть его
+                # то же самое, что вернуть полным.
+                self.buckets.popitem(last=False)
+        return retry_after
+
+
+class CacheStorage:
+    """Вёдра в общем кеше, одни на все процессы.
+
+    Кеш берётся из CACHES по псевдониму RATELIMIT_CACHE; он должен быть
+    общим для процессов, иначе каждый процесс считает лимит отдельно.
+    """
+    prefix = 'ratelimit:'
+
+    def __init__(self, alias=None):
+        self.cache = caches[alias or settings.RATELIMIT_CACHE]
+
+    def consume(self, key, capacity, refill):
+        key = self.prefix + key
+        # Чтение и запись ведра под блокировкой, иначе одновременные
+        # запросы забирают один и тот же токен.
+        lock = f'{key}:lock'
+        for _ in range(LOCK_ATTEMPTS):
+            if self.cache.add(lock, 1, LOCK_TIMEOUT):
+                break
+            time.sleep(LOCK_WAIT)
+        else:
+            return LOCK_WAIT
+        try:
+            state, retry_after = take_token(self.cache.get(key), capacity,
+                                            refill)
+            self.cache.set(key, state, int(capacity / refill) + 1)
+        finally:
+            self.cache.delete(lock)
+        return retry_after
+
+
+def take_token(state, capacity, refill, now=None):
+    """Новое состояние ведра и None, либо секунды до следующего токена."""
+    now = time.time() if now is None else now
+    tokens, updated = state or (capacity, now)
+    tokens = min(capacity, tokens + (now - updated) * refill)
+    if tokens < 1:
+        return (tokens, now), (1 - tokens) / refill
+    return (tokens - 1, now), None
+
+
+_storage = None
+
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        _storage = import_string(settings.RATELIMIT_STORAGE)()
+    return _storage
+
+
+def client_key(request, key):
+    """Ключ ведра: пользователь (или IP для анонимов) либо IP."""
+    if key == 'user' and request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return 'ip:' + request.META.get('REMOTE_ADDR', '')
+
+
+def too_many_requests(retry_after):
+    response = HttpResponse('Слишком много запросов', status=429,
+                            content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = str(int(retry_after) + 1)
+    return response
+
+
+def check(request, scope, rate, key='user', methods=None):
+    """Ответ 429, если лимит исчерпан, иначе None."""
+    if methods and request.method not in methods:
+        return None
+    capacity, refill = parse_rate(rate)
+    retry_after = get_storage().consume(
+        f'{scope}:{client_key(request, key)}', capacity, refill)
+    if retry_after is None:
+        return None
+    return too_many_requests(retry_after)
+
+
+def ratelimit(rate, key='user', methods=None):
+    """Декоратор view: @ratelimit('10/m', methods=['POST'])."""
+    def decorator(view):
+        scope = f'{view.__module__}.{view.__qualname__}'
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = check(request, scope, rate, key, methods)
+            if response is not None:
+                return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
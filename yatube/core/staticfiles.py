@@ -0,0 +1,125 @@
+import gzip
+import json
+import mimetypes
+import os
+import re
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.xml')
+# Сжатая копия сохраняется, только если она заметно меньше оригинала.
+COMPRESS_RATIO = 0.95
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+CSS_STRING = r'"(?:\\.|[^"\\])*"' + r"|'(?:\\.|[^'\\])*'"
+CSS_COMMENT = re.compile(rf'({CSS_STRING})|/\*.*?\*/', re.DOTALL)
+CSS_STRINGS = re.compile(rf'({CSS_STRING})', re.DOTALL)
+CSS_SPACES = re.compile(r'\s+')
+CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+# Пробел перед двоеточием значим в селекторе (a :hover), после — нет.
+CSS_COLON = re.compile(r':\s+')
+
+
+def _minify_code(code):
+    code = CSS_SPACES.sub(' ', code)
+    code = CSS_PUNCTUATION.sub(r'\1', code)
+    code = CSS_COLON.sub(':', code)
+    return code.replace(';}', '}')
+
+
+def minify_css(source):
+    """Убирает комментарии и лишние пробелы, не трогая строки."""
+    source = CSS_COMMENT.sub(lambda match: match.group(1) or '', source)
+    parts = CSS_STRINGS.split(source)
+    # После split строковые литералы стоят на нечётных местах.
+    return ''.join(
+        part if index % 2 else _minify_code(part)
+        for index, part in enumerate(parts)
+    ).strip()
+
+
+def compress_file(path):
+    """Пишет рядом с файлом варианты .gz и .br."""
+    with open(path, 'rb') as source:
+        data = source.read()
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(data)))
+    for suffix, compressed in variants:
+        if len(compressed) < len(data) * COMPRESS_RATIO:
+            with open(path + suffix, 'wb') as target:
+                target.write(compressed)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Хранилище collectstatic: хеш в имени, минификация CSS и сжатие."""
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Файл не собран через collectstatic (разработка, тесты).
+            return name
+
+    def _save(self, name, content):
+        # Сюда попадают и копия исходника, и файлы с хешем в имени,
+        # которые post_process строит из исходника заново.
+        if name.endswith('.css') and not name.endswith('.min.css'):
+            content.seek(0)
+            content = ContentFile(
+                minify_css(content.read().decode()).encode())
+        return super()._save(name, content)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in set(self.hashed_files.values()):
+            if name.endswith(COMPRESS_EXTENSIONS) and self.exists(name):
+                compress_file(self.path(name))
+
+
+class StaticFile:
+    def __init__(self, path, immutable):
+        self.path = path
+        self.immutable = immutable
+        self.content_type = (mimetypes.guess_type(path)[0]
+                             or 'application/octet-stream')
+        stat = os.stat(path)
+        self.etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+        self.variants = [
+            (encoding, path + suffix) for encoding, suffix in ENCODINGS
+            if os.path.exists(path + suffix)
+        ]
+
+    def select(self, accept_encoding):
+        """Путь и Content-Encoding лучшего варианта для клиента."""
+        for encoding, path in self.variants:
+            if encoding in accept_encoding:
+                return path, encoding
+        return self.path, None
+
+
+def scan_static_root(root, manifest_name='staticfiles.json'):
+    """Индекс собранной статики: относительный URL -> StaticFile."""
+    immutable = set()
+    manifest_path = os.path.join(root, manifest_name)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as manifest:
+            immutable.update(json.load(manifest).get('paths', {}).values())
+    files = {}
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(('.gz', '.br')):
+                continue
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            files[name] = StaticFile(path, name in immutable)
+    return files
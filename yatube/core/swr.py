@@ -0,0 +1,89 @@
+"""Кеш со «свежим» и «жёстким» сроком жизни и слиянием запросов.
+
+Запись свежа fresh_timeout секунд, после этого ещё stale_timeout секунд
+она считается устаревшей, но пригодной. Устаревшую запись перестраивает
+только процесс, захвативший блокировку в кеше, остальные в это время
+получают старую копию. При полном промахе запросы без блокировки ждут
+результата захватившего её процесса вместо того, чтобы строить то же
+самое параллельно.
+
+Счётчики по каждому имени: fresh — свежие попадания, stale — отдана
+устаревшая копия, coalesced — дождались чужой генерации, generated —
+построено заново. stale + coalesced — сколько генераций сэкономлено.
+"""
+import time
+import uuid
+
+from django.core.cache import cache
+
+from . import metrics as counters
+
+LOCK_TIMEOUT = 30
+WAIT_INTERVAL = 0.05
+COUNTERS = ('fresh', 'stale', 'coalesced', 'generated')
+
+
+def record(name, counter):
+    counters.incr(f'swr:{name}', counter)
+
+
+def metrics(name):
+    return counters.read(f'swr:{name}', COUNTERS)
+
+
+def acquire(key):
+    """Метка захваченной блокировки генерации или None."""
+    token = uuid.uuid4().hex
+    return token if cache.add(f'{key}:lock', token, LOCK_TIMEOUT) else None
+
+
+def release(key, token):
+    # Блокировку, истёкшую и захваченную другим, не снимаем.
+    if token is not None and cache.get(f'{key}:lock') == token:
+        cache.delete(f'{key}:lock')
+
+
+def regenerate(key, generate, fresh_timeout, stale_timeout, name, token):
+    record(name, 'generated')
+    try:
+        value = generate()
+        if value is not None:
+            cache.set(key, (value, time.time() + fresh_timeout),
+                      fresh_timeout + stale_timeout)
+        return value
+    finally:
+        release(key, token)
+
+
+def wait_for(key):
+    deadline = time.time() + LOCK_TIMEOUT
+    while time.time() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+        if cache.get(f'{key}:lock') is None:
+            return None
+    return None
+
+
+def get_or_generate(key, generate, fresh_timeout, stale_timeout, name):
+    """Значение из кеша или от generate(); None от generate не кешируется."""
+    entry = cache.get(key)
+    if entry is not None and time.time() < entry[1]:
+        record(name, 'fresh')
+        return entry[0]
+    token = acquire(key)
+    if token is not None:
+        return regenerate(key, generate, fresh_timeout, stale_timeout, name,
+                          token)
+    if entry is not None:
+        record(name, 'stale')
+        return entry[0]
+    value = wait_for(key)
+    if value is not None:
+        record(name, 'coalesced')
+        return value
+    # Генерация не дождались; блокировку снимаем, только если взяли сами.
+    return regenerate(key, generate, fresh_timeout, stale_timeout, name,
+                      acquire(key))
@@ -0,0 +1,31 @@
+import os
+
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+
+
+def project_template_names(engine):
+    """Имена всех шаблонов из каталогов DIRS движка."""
+    for directory in engine.dirs:
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if not filename.endswith('.html'):
+                    continue
+                path = os.path.relpath(os.path.join(root, filename),
+                                       directory)
+                yield path.replace(os.sep, '/')
+
+
+def precompile_templates(backends=None):
+    """Компилирует шаблоны проекта в кеш cached.Loader.
+
+    Возвращает количество скомпилированных шаблонов.
+    """
+    compiled = 0
+    for backend in backends or engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        for name in project_template_names(backend.engine):
+            backend.engine.get_template(name)
+            compiled += 1
+    return compiled
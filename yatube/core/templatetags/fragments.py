@@ -0,0 +1,15 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from core.fragments import MARKER
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def fragment(context, template_name):
+    """Как include, но в кешируемой странице оставляет маркер."""
+    request = context.get('request')
+    if getattr(request, 'defer_fragments', False):
+        return mark_safe(MARKER.format(template_name))
+    return context.template.engine.get_template(template_name).render(context)
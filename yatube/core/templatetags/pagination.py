@@ -0,0 +1,25 @@
+from django import template
+
+register = template.Library()
+
+PAGE_WINDOW = 2
+
+
+@register.simple_tag
+def page_window(page_obj, size=PAGE_WINDOW):
+    """Номера страниц вокруг текущей, первая и последняя.
+
+    Пропуски между номерами обозначаются None.
+    """
+    number = page_obj.number
+    last = page_obj.paginator.num_pages
+    pages = {1, last}
+    pages.update(range(max(1, number - size), min(last, number + size) + 1))
+    window = []
+    previous = 0
+    for page in sorted(pages):
+        if page - previous > 1:
+            window.append(None)
+        window.append(page)
+        previous = page
+    return window
@@ -0,0 +1,517 @@
+import datetime
+import gzip
+import os
+import socketserver
+import shutil
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail as django_mail
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.core.paginator import Paginator
+from django.db import connection
+from django.template import engines
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, TestCase,
+                         TransactionTestCase, override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core import jobs, metrics, swr
+from core.bloom import BloomFilter
+from core.lru import LRUCache
+from core.media import parse_range
+from core.models import Job, OutgoingEmail
+from core.ratelimit import (CacheStorage, LocalStorage, ratelimit,
+                            take_token)
+from core.middleware import StaticFilesMiddleware
+from core.staticfiles import minify_css
+from core.template_cache import precompile_templates
+from core.templatetags.pagination import page_window
+
+
+class TemplateCacheTests(TestCase):
+    def test_precompile_fills_cached_loader(self):
+        """Шаблоны проекта попадают в кеш cached.Loader."""
+        backend = engines['django']
+        loader = backend.engine.template_loaders[0]
+        loader.reset()
+        compiled = precompile_templates([backend])
+        self.assertGreater(compiled, 0)
+        self.assertIn('posts/includes/post_list.html',
+                      loader.get_template_cache)
+        self.assertIn('base.html', loader.get_template_cache)
+
+
+class PageWindowTests(TestCase):
+    def window(self, number, count):
+        paginator = Paginator(range(count), 1)
+        return page_window(paginator.page(number))
+
+    def test_small_paginator_lists_all_pages(self):
+        """При малом числе страниц выводятся все номера."""
+        self.assertEqual(self.window(1, 4), [1, 2, 3, 4])
+
+    def test_large_paginator_is_windowed(self):
+        """Выводятся первая, последняя и окно вокруг текущей."""
+        self.assertEqual(self.window(50, 100000),
+                         [1, None, 48, 49, 50, 51, 52, None, 100000])
+        self.assertEqual(self.window(1, 100000), [1, 2, 3, None, 100000])
+
+
+class StaticFilesTests(TestCase):
+    CSS = 'body {\n  color: red;\n}\n/* комментарий */\n' * 50
+
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.source, 'css'))
+        with open(os.path.join(self.source, 'css', 'site.css'), 'w') as f:
+            f.write(self.CSS)
+        self.settings = override_settings(STATICFILES_DIRS=[self.source],
+                                          STATIC_ROOT=self.root)
+        self.settings.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.source)
+        shutil.rmtree(self.root)
+
+    def test_minify_css(self):
+        """CSS минифицируется без изменения правил."""
+        self.assertEqual(minify_css('a {\n color: red; }/* x */'),
+                         'a{color:red}')
+
+    def test_minify_css_keeps_strings_and_selectors(self):
+        """Строки и пробел перед псевдоклассом не меняются."""
+        self.assertEqual(
+            minify_css('a :hover > b { content: " a : b ; } /* c */"; }'),
+            'a :hover>b{content:" a : b ; } /* c */"}')
+
+    def test_hashed_file_is_minified(self):
+        """Файл с хешем в имени и его .gz минифицированы."""
+        middleware = StaticFilesMiddleware(lambda request: None)
+        name = next(name for name in middleware.files
+                    if name.startswith('css/site.') and name != 'css/site.css')
+        path = os.path.join(self.root, name)
+        expected = minify_css(self.CSS).encode()
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), expected)
+        with gzip.open(path + '.gz') as f:
+            self.assertEqual(f.read(), expected)
+
+    def test_serves_compressed_immutable_file(self):
+        """Собранный файл отдаётся сжатым с вечным кешированием."""
+        middleware = StaticFilesMiddleware(lambda request: None)
+        name = next(name for name in middleware.files
+                    if name.startswith('css/site.') and name != 'css/site.css')
+        request = RequestFactory().get(f'/static/{name}',
+                                       HTTP_ACCEPT_ENCODING='gzip')
+        response = middleware(request)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        response.close()
+
+    def test_not_modified(self):
+        """По совпадающему ETag возвращается 304."""
+        middleware = StaticFilesMiddleware(lambda request: None)
+        static_file = middleware.files['css/site.css']
+        request = RequestFactory().get(
+            '/static/css/site.css', HTTP_IF_NONE_MATCH=static_file.etag)
+        self.assertEqual(middleware(request).status_code, 304)
+
+
+class MediaServeTests(TestCase):
+    CONTENT = bytes(range(256)) * 4
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, 'posts'))
+        with open(os.path.join(self.root, 'posts', 'image.jpg'), 'wb') as f:
+            f.write(self.CONTENT)
+        self.settings = override_settings(MEDIA_ROOT=self.root)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.root)
+
+    def test_parse_range(self):
+        """Разбор заголовка Range."""
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 100))
+        with self.assertRaises(ValueError):
+            parse_range('bytes=200-', 100)
+
+    def test_full_file_with_validators(self):
+        """Файл отдаётся целиком с ETag и Last-Modified."""
+        response = self.client.get('/media/posts/image.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        not_modified = self.client.get('/media/posts/image.jpg',
+                                       HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_range_request(self):
+        """Range возвращает 206 и запрошенный кусок."""
+        response = self.client.get('/media/posts/image.jpg',
+                                   HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content),
+                         self.CONTENT[10:20])
+        self.assertEqual(response['Content-Range'],
+                         f'bytes 10-19/{len(self.CONTENT)}')
+        response = self.client.get('/media/posts/image.jpg',
+                                   HTTP_RANGE='bytes=5000-')
+        self.assertEqual(response.status_code, 416)
+
+    @override_settings(MEDIA_SENDFILE_HEADER='X-Accel-Redirect')
+    def test_accel_redirect(self):
+        """Передача файла поручается nginx."""
+        response = self.client.get('/media/posts/image.jpg')
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected-media/posts/image.jpg')
+        self.assertEqual(response.content, b'')
+
+    def test_missing_and_outside_files(self):
+        """Несуществующие файлы и выход за MEDIA_ROOT дают 404."""
+        for path in ('/media/posts/none.jpg', '/media/../settings.py'):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 404)
+
+
+class RateLimitTests(TestCase):
+    def tearDown(self):
+        cache.clear()
+        caches['shared'].clear()
+
+    def test_token_bucket(self):
+        """Ведро пустеет за capacity запросов и наполняется со временем."""
+        state = None
+        for _ in range(3):
+            state, retry_after = take_token(state, 3, 1, now=0)
+            self.assertIsNone(retry_after)
+        _, retry_after = take_token(state, 3, 1, now=0)
+        self.assertEqual(retry_after, 1)
+        _, retry_after = take_token(state, 3, 1, now=1)
+        self.assertIsNone(retry_after)
+
+    def test_local_storage_is_bounded(self):
+        """Локальное хранилище помнит не больше max_buckets вёдер."""
+        storage = LocalStorage(max_buckets=2)
+        for key in ('a', 'b', 'c'):
+            storage.consume(key, 1, 1)
+        self.assertEqual(list(storage.buckets), ['b', 'c'])
+
+    def test_cache_storage_concurrent_requests(self):
+        """Одновременные запросы не получают больше токенов, чем в ведре."""
+        # Тестовая база SQLite в памяти не пускает потоки писать в
+        # таблицу кеша одновременно, блокировку проверяем на кеше процесса.
+        storage = CacheStorage('default')
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            storage.consume('concurrent', 5, 0.001))) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(None), 5)
+
+    @override_settings(RATELIMIT_CACHE='ratelimit', CACHES={
+        **settings.CACHES,
+        'ratelimit': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'ratelimit-tests',
+        },
+    })
+    def test_cache_storage_uses_configured_alias(self):
+        """Вёдра лежат в кеше RATELIMIT_CACHE, а не в кеше процесса."""
+        storage = CacheStorage()
+        storage.consume('alias', 1, 1)
+        self.assertIsNotNone(caches['ratelimit'].get('ratelimit:alias'))
+        self.assertIsNone(cache.get('ratelimit:alias'))
+        self.assertIsNone(caches['shared'].get('ratelimit:alias'))
+        self.assertIsNotNone(storage.consume('alias', 1, 1))
+
+    def test_decorator(self):
+        """Декоратор отвечает 429 сверх лимита."""
+        view = ratelimit('2/m', key='ip')(lambda request: HttpResponse())
+        factory = RequestFactory()
+        statuses = [view(factory.get('/')).status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+
+    @override_settings(RATELIMITS={
+        'posts:profile_follow': {'rate': '1/m'},
+    })
+    def test_middleware_rejects_before_view(self):
+        """Middleware не пускает запрос сверх лимита во view."""
+        user = get_user_model().objects.create_user(username='user')
+        get_user_model().objects.create_user(username='author')
+        client = Client()
+        client.force_login(user)
+        url = reverse('posts:profile_follow', args=['author'])
+        self.assertEqual(client.get(url).status_code, 302)
+        # View не вызывается: подписки в базе не ищутся.
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 429)
+        self.assertFalse(any('"posts_follow"' in query['sql']
+                             for query in queries.captured_queries))
+        self.assertIn('Retry-After', response)
+
+
+class MetricsTests(TestCase):
+    def test_counters_reach_shared_cache(self):
+        """Счётчики процесса попадают в общий кеш и видны командам."""
+        metrics.incr('metrics-test', 'hits', 2)
+        metrics.flush()
+        self.assertEqual(caches['shared'].get('metrics:metrics-test:hits'),
+                         2)
+        metrics.incr('metrics-test', 'hits')
+        self.assertEqual(metrics.read('metrics-test', ('hits', 'misses')),
+                         {'hits': 3, 'misses': 0})
+
+
+class BloomFilterTests(TestCase):
+    def test_no_false_negatives(self):
+        """Добавленные значения всегда находятся, чужие — редко."""
+        bloom = BloomFilter(1000, error_rate=0.01)
+        for number in range(1000):
+            bloom.add(f'user{number}')
+        for number in range(1000):
+            self.assertIn(f'user{number}', bloom)
+        false_positives = sum(
+            f'bot{number}' in bloom for number in range(1000))
+        self.assertLess(false_positives, 50)
+
+
+class LRUCacheTests(TestCase):
+    def test_evicts_least_recently_used(self):
+        """При превышении бюджета вытесняется давно не читавшаяся запись."""
+        lru = LRUCache(max_bytes=10)
+        lru.set('a', b'1234')
+        lru.set('b', b'1234')
+        lru.get('a')
+        lru.set('c', b'1234')
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('a'), b'1234')
+        self.assertEqual(lru.size, 8)
+
+    def test_entries_expire(self):
+        """Запись с истёкшим timeout не отдаётся и освобождает место."""
+        lru = LRUCache(max_bytes=10, timeout=0)
+        lru.set('a', b'1234')
+        self.assertIsNone(lru.get('a'))
+        self.assertEqual(lru.size, 0)
+
+
+class StaleWhileRevalidateTests(TestCase):
+    KEY = 'swr-test'
+
+    def tearDown(self):
+        cache.clear()
+
+    def get(self, value):
+        return swr.get_or_generate(self.KEY, lambda: value, 0, 60, 'test')
+
+    def test_stale_copy_served_while_locked(self):
+        """Пока другой процесс держит блокировку, отдаётся старая копия."""
+        self.assertEqual(self.get('old'), 'old')
+        cache.add(f'{self.KEY}:lock', 1)
+        self.assertEqual(self.get('new'), 'old')
+        cache.delete(f'{self.KEY}:lock')
+        self.assertEqual(self.get('new'), 'new')
+        self.assertEqual(swr.metrics('test'), {
+            'fresh': 0, 'stale': 1, 'coalesced': 0, 'generated': 2})
+
+    def test_miss_waits_for_running_generation(self):
+        """Промах при чужой генерации дожидается её результата."""
+        cache.add(f'{self.KEY}:lock', 1)
+
+        def finish_generation():
+            time.sleep(0.1)
+            cache.set(self.KEY, ('shared', time.time() + 60))
+
+        thread = threading.Thread(target=finish_generation)
+        thread.start()
+        self.assertEqual(self.get('own'), 'shared')
+        thread.join()
+        self.assertEqual(swr.metrics('test')['coalesced'], 1)
+
+    def test_waiter_keeps_foreign_lock(self):
+        """Не дождавшийся генерации запрос не снимает чужую блокировку."""
+        cache.add(f'{self.KEY}:lock', 'other', None)
+        with mock.patch.object(swr, 'LOCK_TIMEOUT', 0.1):
+            self.assertEqual(self.get('own'), 'own')
+        self.assertEqual(cache.get(f'{self.KEY}:lock'), 'other')
+
+
+JOB_CALLS = []
+
+
+def record_job(value):
+    JOB_CALLS.append(value)
+
+
+def failing_job():
+    raise RuntimeError('boom')
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        JOB_CALLS.clear()
+
+    def test_jobs_run_by_priority(self):
+        """Задачи выполняются по убыванию приоритета."""
+        jobs.enqueue(record_job, 'low')
+        jobs.enqueue(record_job, 'high', priority=5)
+        jobs.enqueue(record_job, 'later', delay=60)
+        self.assertEqual(jobs.run_pending(), 2)
+        self.assertEqual(JOB_CALLS, ['high', 'low'])
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 2)
+
+    def test_failed_job_is_retried_with_backoff(self):
+        """Упавшая задача откладывается, после предела — failed."""
+        job = jobs.enqueue(failing_job, max_attempts=2)
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('boom', job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
+        Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_abandoned_job_is_claimed_again(self):
+        """Задачу умершего исполнителя забирает другой."""
+        job = jobs.enqueue(record_job, 'again')
+        self.assertEqual(jobs.claim('dead').id, job.id)
+        self.assertIsNone(jobs.claim('alive'))
+        Job.objects.filter(id=job.id).update(
+            started_at=timezone.now() - datetime.timedelta(hours=1))
+        self.assertEqual(jobs.claim('alive').id, job.id)
+
+    def test_abandoned_job_is_claimed_once(self):
+        """Брошенную задачу не забирают два исполнителя сразу."""
+        job = jobs.enqueue(record_job, 'once')
+        jobs.claim('dead')
+        Job.objects.filter(id=job.id).update(
+            started_at=timezone.now() - datetime.timedelta(hours=1))
+        # Второй исполнитель выбрал задачу до того, как её забрал первый.
+        seen = Job.objects.get(id=job.id)
+        self.assertEqual(jobs.claim('first').id, job.id)
+        with mock.patch.object(jobs, 'ready_jobs') as ready_jobs:
+            ready_jobs.return_value.only.return_value.first.return_value = (
+                seen)
+            self.assertIsNone(jobs.claim('second'))
+
+
+class RunJobsCommandTests(TransactionTestCase):
+    def setUp(self):
+        JOB_CALLS.clear()
+
+    def test_threads_drain_queue(self):
+        """Потоки исполнителя выполняют каждую задачу один раз."""
+        for number in range(20):
+            jobs.enqueue(record_job, number)
+        out = StringIO()
+        call_command('run_jobs', threads=4, once=True, stdout=out)
+        self.assertEqual(sorted(JOB_CALLS), list(range(20)))
+        self.assertIn('Выполнено задач: 20', out.getvalue())
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Минимальный SMTP-сервер: принимает письма в server.messages."""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 localhost')
+        while True:
+            line = self.rfile.readline().decode().strip()
+            command = line[:4].upper()
+            if not line or command == 'QUIT':
+                self.reply('221 bye')
+                return
+            if command == 'DATA':
+                self.reply('354 go ahead')
+                data = []
+                for raw in iter(self.rfile.readline, b''):
+                    if raw in (b'.\r\n', b'.\n'):
+                        break
+                    data.append(raw)
+                self.server.messages.append(b''.join(data))
+            self.reply('250 OK')
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.connections = 0
+        self.messages = []
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+    EMAIL_DELIVERY_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+    EMAIL_HOST='127.0.0.1',
+)
+class QueuedEmailTests(TestCase):
+    def setUp(self):
+        self.server = SMTPStandIn()
+        threading.Thread(target=self.server.serve_forever,
+                         daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_mail_is_queued_and_sent_over_one_connection(self):
+        """Письма ждут в очереди и уходят пакетом по одному соединению."""
+        for number in range(3):
+            django_mail.send_mail(f'Письмо {number}', 'Текст',
+                                  'site@yatube.ru', [f'u{number}@x.ru'])
+        self.assertEqual(self.server.messages, [])
+        self.assertEqual(OutgoingEmail.objects.count(), 3)
+        with self.settings(EMAIL_PORT=self.server.server_address[1]):
+            jobs.run_pending()
+        self.assertEqual(len(self.server.messages), 3)
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(
+            OutgoingEmail.objects.filter(status=OutgoingEmail.SENT).count(),
+            3)
+
+    def test_unreachable_server_keeps_mail_queued(self):
+        """Если SMTP недоступен, письма остаются в очереди."""
+        django_mail.send_mail('Тема', 'Текст', 'site@yatube.ru', ['u@x.ru'])
+        self.server.shutdown()
+        self.server.server_close()
+        with self.settings(EMAIL_PORT=self.server.server_address[1]), \
+                self.assertLogs('core', 'ERROR') as logs:
+            jobs.run_pending()
+        self.assertIn('ConnectionRefusedError', logs.output[0])
+        self.assertEqual(
+            OutgoingEmail.objects.get().status, OutgoingEmail.QUEUED)
+        self.assertEqual(Job.objects.get().status, Job.QUEUED)
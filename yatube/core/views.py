@@ -1,8 +1,26 @@
+from django.core.cache import cache
+from django.http import HttpResponseNotFound
 from django.shortcuts import render
+from django.utils.html import escape
+
+from .fragments import fill_fragments
+
+NOT_FOUND_KEY = 'core:404'
+NOT_FOUND_TIMEOUT = 60 * 15
+# Подставляется вместо адреса при рендере общей для всех копии 404.
+PATH_SLOT = 'not-found-path-slot'
 
 
 def page_not_found(request, exception):
-    return render(request, 'core/404.html', {'path': request.path}, status=404)
+    content = cache.get(NOT_FOUND_KEY)
+    if content is None:
+        request.defer_fragments = True
+        content = render(request, 'core/404.html',
+                         {'path': PATH_SLOT}).content.decode()
+        request.defer_fragments = False
+        cache.set(NOT_FOUND_KEY, content, NOT_FOUND_TIMEOUT)
+    content = content.replace(PATH_SLOT, escape(request.path))
+    return HttpResponseNotFound(fill_fragments(request, content))
 
 
 def csrf_failure(request, reason=''):
@@ -0,0 +1,52 @@
+"""Поддержка денормализованных полей активности групп и постов.
+
+Обработчики подключаются в PostsConfig.ready и выполняются в
+транзакции сохранения (см. Post.save, Comment.save) или удаления.
+"""
+from django.db.models import Count, F, Max
+
+from .models import ArchivedPost, Group, Post
+
+
+def refresh_group(group_id):
+    """Пересчитывает post_count и last_post_at группы с учётом архива."""
+    if group_id is None:
+        return
+    stats = Post.objects.filter(group_id=group_id).order_by().aggregate(
+        count=Count('id'), last=Max('pub_date'))
+    archived = ArchivedPost.objects.filter(
+        group_id=group_id).order_by().aggregate(
+        count=Count('id'), last=Max('pub_date'))
+    Group.objects.filter(pk=group_id).update(
+        post_count=stats['count'] + archived['count'],
+        last_post_at=stats['last'] or archived['last'])
+
+
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        if instance.group_id is not None:
+            Group.objects.filter(pk=instance.group_id).update(
+                post_count=F('post_count') + 1,
+                last_post_at=instance.pub_date,
+            )
+    else:
+        old_group_id = getattr(instance, 'loaded_group_id', None)
+        if old_group_id != instance.group_id:
+            refresh_group(old_group_id)
+            refresh_group(instance.group_id)
+    instance.loaded_group_id = instance.group_id
+
+
+def post_deleted(sender, instance, **kwargs):
+    refresh_group(instance.group_id)
+
+
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    Post.objects.filter(pk=instance.post_id).update(
+        last_comment_at=instance.created)
+    Group.objects.filter(posts__pk=instance.post_id).update(
+        last_comment_at=instance.created)
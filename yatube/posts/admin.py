@@ -1,15 +1,88 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.template.response import TemplateResponse
 
+from core.paginator import EstimatedCountPaginator
+
+from . import bulk, search
 from .models import Post, Group
 
 
+class PostActionForm(helpers.ActionForm):
+    group = forms.ModelChoiceField(
+        Group.objects.order_by('title'), required=False, label='Группа')
+
+
 class PostAdmin(admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group',)
     list_editable = ('group',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
+    # Режим для больших таблиц: без полного COUNT(*), без списка всех
+    # групп в каждой строке, поиск по индексу FTS, массовые действия
+    # пакетами в очереди задач.
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    action_form = PostActionForm
+    actions = ('move_to_group', 'delete_in_batches')
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        # Стандартное удаление загружает все выбранные посты сразу.
+        actions.pop('delete_selected', None)
+        return actions
+
+    def get_search_results(self, request, queryset, search_term):
+        found = search.search_posts(queryset, search_term)
+        if found is None:
+            return super().get_search_results(
+                request, queryset, search_term)
+        return found, False
+
+    def move_to_group(self, request, queryset):
+        group_id = request.POST.get('group')
+        group = (Group.objects.filter(pk=group_id).first()
+                 if group_id and group_id.isdigit() else None)
+        if group is None:
+            self.message_user(request, 'Выберите группу для переноса.',
+                              messages.WARNING)
+            return None
+        count = bulk.enqueue_in_batches(bulk.move_posts, queryset, group.id)
+        self.message_user(
+            request, f'Перенос в «{group}» поставлен в очередь: '
+                     f'{count} пакетов по {bulk.BATCH_SIZE}.')
+        return None
+    move_to_group.short_description = 'Перенести в группу'
+    move_to_group.allowed_permissions = ('change',)
+
+    def delete_in_batches(self, request, queryset):
+        if request.POST.get('confirm') != 'yes':
+            return TemplateResponse(
+                request, 'admin/posts/post/delete_in_batches.html', {
+                    **self.admin_site.each_context(request),
+                    'opts': self.model._meta,
+                    'title': 'Удалить посты пакетами?',
+                    'select_across': request.POST.get('select_across'),
+                    'selected': request.POST.getlist(
+                        helpers.ACTION_CHECKBOX_NAME),
+                    'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+                })
+        count = bulk.enqueue_in_batches(bulk.delete_posts, queryset)
+        self.message_user(
+            request, f'Удаление поставлено в очередь: '
+                     f'{count} пакетов по {bulk.BATCH_SIZE}.')
+        return None
+    delete_in_batches.short_description = 'Удалить пакетами в фоне'
+    delete_in_batches.allowed_permissions = ('delete',)
+
+
+class GroupAdmin(admin.ModelAdmin):
+    search_fields = ('title', 'slug')
 
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
+admin.site.register(Group, GroupAdmin)
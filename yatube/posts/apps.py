@@ -1,5 +1,30 @@
 from django.apps import AppConfig
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
 
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from . import (activity, feed_cache, follow_graph, image_meta,
+                       lookup_filter, object_cache)
+        from .models import Comment, Follow, Group, Post
+
+        post_save.connect(follow_graph.follow_changed, sender=Follow)
+        post_delete.connect(follow_graph.follow_changed, sender=Follow)
+        post_save.connect(activity.post_saved, sender=Post)
+        post_delete.connect(activity.post_deleted, sender=Post)
+        post_save.connect(activity.comment_saved, sender=Comment)
+        post_save.connect(feed_cache.post_changed, sender=Post)
+        post_delete.connect(feed_cache.post_changed, sender=Post)
+        post_save.connect(feed_cache.follow_changed, sender=Follow)
+        post_delete.connect(feed_cache.follow_changed, sender=Follow)
+        for model in (Post, Group, get_user_model()):
+            post_save.connect(object_cache.object_changed, sender=model)
+            post_delete.connect(object_cache.object_changed, sender=model)
+        post_save.connect(lookup_filter.post_saved, sender=Post)
+        post_save.connect(lookup_filter.object_saved, sender=Group)
+        post_save.connect(lookup_filter.object_saved,
+                          sender=get_user_model())
+        post_save.connect(image_meta.image_saved, sender=Post)
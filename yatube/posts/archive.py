@@ -0,0 +1,44 @@
+"""Лента из рабочей таблицы постов и архива.
+
+Команда archive_posts переносит в архив посты старше заданной даты,
+поэтому все архивные посты старше любого поста рабочей таблицы и
+ленту, отсортированную по убыванию даты, можно получить простой
+конкатенацией: сначала рабочие посты, затем архивные.
+"""
+
+
+class ArchiveFeed:
+    """Последовательность для Paginator поверх двух QuerySet."""
+
+    def __init__(self, hot, archived):
+        self.hot = hot
+        self.archived = archived
+        self._hot_count = None
+        self._archived_count = None
+
+    @property
+    def hot_count(self):
+        if self._hot_count is None:
+            self._hot_count = self.hot.count()
+        return self._hot_count
+
+    def count(self):
+        if self._archived_count is None:
+            self._archived_count = self.archived.count()
+        return self.hot_count + self._archived_count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+        items = []
+        if start < self.hot_count:
+            items += self.hot[start:min(stop, self.hot_count)]
+        if stop > self.hot_count:
+            items += self.archived[max(start - self.hot_count, 0):
+                                   stop - self.hot_count]
+        return items
@@ -0,0 +1,55 @@
+"""Массовые операции над постами из админки, пакетами в core.jobs.
+
+Действие админки только раскладывает id постов по задачам очереди по
+BATCH_SIZE штук, каждая задача выполняется своей короткой
+транзакцией и не держит базу заблокированной надолго.
+"""
+from django.db import transaction
+
+from core import jobs
+
+from . import activity, feed_cache, follow_graph, object_cache
+from .models import Post
+
+BATCH_SIZE = 500
+
+
+def enqueue_in_batches(func, queryset, *args):
+    """Ставит func(ids, *args) в очередь для пакетов id; число задач."""
+    ids = queryset.order_by().values_list('id', flat=True).iterator()
+    count = 0
+    batch = []
+    for post_id in ids:
+        batch.append(post_id)
+        if len(batch) == BATCH_SIZE:
+            jobs.enqueue(func, batch, *args)
+            count += 1
+            batch = []
+    if batch:
+        jobs.enqueue(func, batch, *args)
+        count += 1
+    return count
+
+
+def move_posts(post_ids, group_id):
+    """Переносит посты в группу одним UPDATE, без save() каждого."""
+    posts = Post.objects.filter(id__in=post_ids)
+    with transaction.atomic():
+        moved = list(posts.exclude(group_id=group_id)
+                     .values_list('id', 'group_id', 'author_id'))
+        Post.objects.filter(id__in=[post_id for post_id, _, _ in moved]
+                            ).update(group_id=group_id)
+        for old_group_id in {group for _, group, _ in moved}:
+            activity.refresh_group(old_group_id)
+        activity.refresh_group(group_id)
+    object_cache.invalidate(Post, [post_id for post_id, _, _ in moved])
+    readers = set()
+    for author_id in {author for _, _, author in moved}:
+        readers.update(follow_graph.followers(author_id))
+    feed_cache.invalidate(readers)
+
+
+def delete_posts(post_ids):
+    """Удаляет пакет постов; счётчики и кеши обновляют сигналы."""
+    with transaction.atomic():
+        Post.objects.filter(id__in=post_ids).delete()
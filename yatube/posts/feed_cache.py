@@ -0,0 +1,79 @@
+"""Кеш отрендеренной ленты подписок для каждого пользователя.
+
+Страница хранится в LRU-кеше процесса под ключом
+(пользователь, номер страницы, поколение ленты) не дольше
+FEED_CACHE_TIMEOUT. Поколение лежит в общем для процессов кеше
+'shared' и меняется после коммита подписки или отписки, а для
+подписчиков автора — задачей core.jobs, которую ставит публикация,
+изменение или удаление его поста. Старые страницы после этого
+недостижимы и истекают.
+"""
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+
+from core import jobs
+from core.lru import LRUCache
+
+from . import follow_graph
+
+GENERATION_KEY = 'feed_cache:generation:{}'
+
+pages = LRUCache(settings.FEED_CACHE_MAX_BYTES,
+                 settings.FEED_CACHE_TIMEOUT)
+
+
+def generation(user_id):
+    shared = caches['shared']
+    key = GENERATION_KEY.format(user_id)
+    token = shared.get(key)
+    if token is None:
+        shared.add(key, uuid.uuid4().hex, None)
+        token = shared.get(key)
+    return token
+
+
+def invalidate(user_ids):
+    caches['shared'].set_many(
+        {GENERATION_KEY.format(user_id): uuid.uuid4().hex
+         for user_id in user_ids},
+        None,
+    )
+
+
+def invalidate_followers(author_id):
+    invalidate(follow_graph.followers(author_id))
+
+
+def cache_user_feed(view):
+    """Кеширует GET-ответы view для каждого пользователя."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != 'GET' or not request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+        key = '{}:{}:{}'.format(request.user.pk,
+                                request.GET.get('page', '1'),
+                                generation(request.user.pk))
+        content = pages.get(key)
+        if content is not None:
+            return HttpResponse(content)
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming:
+            pages.set(key, response.content)
+        return response
+    return wrapper
+
+
+def post_changed(sender, instance, **kwargs):
+    # Подписчиков может быть много, их поколения меняет исполнитель
+    # очереди; задача пишется в той же транзакции, что и пост.
+    jobs.enqueue(invalidate_followers, instance.author_id)
+
+
+def follow_changed(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate([user_id]))
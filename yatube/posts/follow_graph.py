@@ -0,0 +1,69 @@
+"""Кеш графа подписок.
+
+Для каждого пользователя в кеше лежат отсортированные массивы id
+авторов, на которых он подписан, и id его подписчиков. Граф лежит в
+общем кеше 'shared': подписку может сохранить любой процесс, а
+читают граф и страницы, и воркер задач. Записи сбрасываются сигналами
+модели Follow (см. PostsConfig.ready).
+"""
+from array import array
+from bisect import bisect_left
+
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import Follow
+
+FOLLOW_GRAPH_TIMEOUT = 60 * 60
+FOLLOWEES_KEY = 'follow_graph:followees:{}'
+FOLLOWERS_KEY = 'follow_graph:followers:{}'
+
+
+def _load(key, queryset):
+    shared = caches['shared']
+    ids = shared.get(key)
+    if ids is None:
+        ids = array('q', queryset)
+        shared.set(key, ids, FOLLOW_GRAPH_TIMEOUT)
+    return ids
+
+
+def followees(user_id):
+    """Отсортированный массив id авторов, на которых подписан user_id."""
+    return _load(
+        FOLLOWEES_KEY.format(user_id),
+        Follow.objects.filter(user_id=user_id)
+        .order_by('author_id').values_list('author_id', flat=True),
+    )
+
+
+def followers(author_id):
+    """Отсортированный массив id подписчиков автора."""
+    return _load(
+        FOLLOWERS_KEY.format(author_id),
+        Follow.objects.filter(author_id=author_id)
+        .order_by('user_id').values_list('user_id', flat=True),
+    )
+
+
+def follower_count(author_id):
+    return len(followers(author_id))
+
+
+def is_following(user_id, author_id):
+    ids = followees(user_id)
+    index = bisect_left(ids, author_id)
+    return index < len(ids) and ids[index] == author_id
+
+
+def invalidate(user_id, author_id):
+    caches['shared'].delete_many([FOLLOWEES_KEY.format(user_id),
+                                  FOLLOWERS_KEY.format(author_id)])
+
+
+def follow_changed(sender, instance, **kwargs):
+    invalidate(instance.user_id, instance.author_id)
+    # Параллельный запрос мог до коммита снова положить в кеш старый
+    # граф, поэтому после коммита записи удаляются ещё раз.
+    transaction.on_commit(
+        lambda: invalidate(instance.user_id, instance.author_id))
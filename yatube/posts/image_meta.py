@@ -0,0 +1,63 @@
+"""Размеры, основной цвет и заглушка картинки поста.
+
+Считаются один раз при загрузке (Post.save), чтобы шаблоны резервировали
+место под картинку и показывали заглушку, не открывая файл во время
+запроса. Заглушка — картинка шириной в несколько пикселей в data URI:
+браузер растягивает её под размер миниатюры, получается размытое
+превью, как у blurhash, но без декодера на JavaScript.
+"""
+from base64 import b64encode
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+from core import jobs
+
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_QUALITY = 40
+PALETTE_COLORS = 8
+
+
+def dominant_color(image):
+    """Самый частый цвет палитры из PALETTE_COLORS цветов, #rrggbb."""
+    quantized = image.quantize(PALETTE_COLORS)
+    _, index = max(quantized.getcolors())
+    red, green, blue = quantized.getpalette()[index * 3:index * 3 + 3]
+    return f'#{red:02x}{green:02x}{blue:02x}'
+
+
+def describe(file):
+    """Поля image_* модели Post для открытого файла картинки."""
+    file.seek(0)
+    with Image.open(file) as source:
+        image = ImageOps.exif_transpose(source).convert('RGB')
+    file.seek(0)
+    width, height = image.size
+    image.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    output = BytesIO()
+    image.save(output, 'JPEG', quality=PLACEHOLDER_QUALITY)
+    return {
+        'image_width': width,
+        'image_height': height,
+        'image_color': dominant_color(image),
+        'image_placeholder': ('data:image/jpeg;base64,'
+                              + b64encode(output.getvalue()).decode()),
+    }
+
+
+def build_thumbnail(post_id):
+    """Задача очереди: миниатюра картинки поста."""
+    from .models import Post
+    from .presenters import thumbnail_url
+    post = Post.objects.filter(id=post_id).only('image').first()
+    if post is not None and post.image:
+        thumbnail_url(post.image)
+
+
+def image_saved(sender, instance, **kwargs):
+    """Ставит в очередь миниатюру новой картинки.
+
+    Иначе её строил бы первый запрос ленты с этим постом.
+    """
+    if instance.image and getattr(instance, 'image_changed', False):
+        jobs.enqueue(build_thumbnail, instance.id, priority=10)
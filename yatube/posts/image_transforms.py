@@ -0,0 +1,145 @@
+"""Картинки постов произвольного размера по подписанным адресам.
+
+Адрес содержит размер, кадрирование и формат (spec, например
+«480x320-center.webp») и подпись, без которой запрос отклоняется:
+иначе перебором размеров можно заставить сервер бесконечно ресайзить.
+Результаты хранятся в DiskCache с бюджетом IMAGE_CACHE_MAX_BYTES.
+Одинаковые преобразования не выполняются параллельно: первый запрос
+берёт блокировку в общем кеше 'shared', остальные запросы, в том числе
+из других процессов, ждут появления файла.
+"""
+import hashlib
+import re
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.utils.crypto import constant_time_compare
+from PIL import Image, ImageOps
+
+from core import metrics
+from core.disk_cache import DiskCache
+
+from .url_builder import fast_url
+
+SPEC_RE = re.compile(
+    r'^(?P<width>\d{1,4})x(?P<height>\d{1,4})'
+    r'-(?P<crop>fit|center|top)\.(?P<ext>jpg|png|webp)$')
+MAX_SIDE = 2000
+QUALITY = 85
+FORMATS = {'jpg': 'JPEG', 'png': 'PNG', 'webp': 'WEBP'}
+CONTENT_TYPES = {'jpg': 'image/jpeg', 'png': 'image/png',
+                 'webp': 'image/webp'}
+CENTERING = {'center': (0.5, 0.5), 'top': (0.5, 0.0)}
+LOCK_TIMEOUT = 30
+WAIT_INTERVAL = 0.05
+
+signer = signing.Signer(salt='posts.image_transforms')
+_caches = {}
+
+
+class Spec:
+    def __init__(self, width, height, crop, ext):
+        self.width = width
+        self.height = height
+        self.crop = crop
+        self.ext = ext
+
+    def __str__(self):
+        return f'{self.width}x{self.height}-{self.crop}.{self.ext}'
+
+    @property
+    def content_type(self):
+        return CONTENT_TYPES[self.ext]
+
+
+def can_save(ext):
+    # WebP есть не во всех сборках Pillow.
+    Image.init()
+    return FORMATS[ext] in Image.SAVE
+
+
+def parse_spec(value):
+    """Spec из строки адреса или ValueError."""
+    match = SPEC_RE.match(value)
+    if match is None:
+        raise ValueError(f'Bad image spec: {value}')
+    width, height = int(match['width']), int(match['height'])
+    if not (0 < width <= MAX_SIDE and 0 < height <= MAX_SIDE):
+        raise ValueError(f'Image size out of range: {value}')
+    if not can_save(match['ext']):
+        raise ValueError(f'Format not supported by Pillow: {value}')
+    return Spec(width, height, match['crop'], match['ext'])
+
+
+def sign(post_id, spec):
+    return signer.signature(f'{post_id}/{spec}')
+
+
+def check_signature(post_id, spec, signature):
+    return constant_time_compare(sign(post_id, spec), signature)
+
+
+def image_url(post_id, width, height, crop='center', ext='jpg'):
+    spec = Spec(width, height, crop, ext)
+    return fast_url('posts:post_image', post_id, sign(post_id, spec),
+                    str(spec))
+
+
+def image_cache():
+    key = (settings.IMAGE_CACHE_ROOT, settings.IMAGE_CACHE_MAX_BYTES)
+    if key not in _caches:
+        _caches[key] = DiskCache(*key)
+    return _caches[key]
+
+
+def render(file, spec):
+    """Байты картинки из file, преобразованной по spec."""
+    with Image.open(file) as source:
+        image = ImageOps.exif_transpose(source)
+        if spec.crop == 'fit':
+            image.thumbnail((spec.width, spec.height), Image.LANCZOS)
+        else:
+            image = ImageOps.fit(image, (spec.width, spec.height),
+                                 Image.LANCZOS,
+                                 centering=CENTERING[spec.crop])
+        if spec.ext == 'jpg' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        output = BytesIO()
+        image.save(output, FORMATS[spec.ext], quality=QUALITY)
+    return output.getvalue()
+
+
+def generate(disk_cache, key, image, spec):
+    metrics.incr('image_transforms', 'generated')
+    with image.open('rb') as file:
+        return disk_cache.set(key, render(file, spec))
+
+
+def transformed_path(image, spec):
+    """Путь к файлу image, преобразованной по spec, в дисковом кеше."""
+    disk_cache = image_cache()
+    key = hashlib.sha256(f'{image.name}/{spec}'.encode()).hexdigest()
+    path = disk_cache.get(key)
+    if path is not None:
+        metrics.incr('image_transforms', 'cached')
+        return path
+    lock_key = f'image_transforms:{key}:lock'
+    shared = caches['shared']
+    if shared.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            return generate(disk_cache, key, image, spec)
+        finally:
+            shared.delete(lock_key)
+    deadline = time.time() + LOCK_TIMEOUT
+    while True:
+        time.sleep(WAIT_INTERVAL)
+        locked = shared.get(lock_key) is not None
+        path = disk_cache.get(key)
+        if path is not None:
+            metrics.incr('image_transforms', 'coalesced')
+            return path
+        if not locked or time.time() > deadline:
+            return generate(disk_cache, key, image, spec)
@@ -0,0 +1,174 @@
+"""Фильтр Блума существующих постов, групп и пользователей.
+
+Запросы к несуществующим /posts/<id>/, /group/<slug>/ и
+/profile/<username>/ отсекаются без обращения к базе. Фильтры строятся
+в памяти процесса при первой проверке, каждый отдельно, и
+перестраиваются, только когда им больше FILTER_MAX_AGE.
+
+Новые посты фильтр не трогают: id растут, и id больше известного при
+постройке пропускаются в базу. Новый slug или username сохранивший
+процесс добавляет в свой фильтр сразу, а после коммита дописывает в
+журнал в общем кеше 'shared'. Остальные процессы не чаще раза в
+PULL_INTERVAL дочитывают журнал и добавляют значения в свои фильтры.
+Удалённые значения остаются в фильтре и просто не отсекаются.
+"""
+import threading
+import time
+from itertools import chain
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+
+from core.bloom import BloomFilter
+
+from .models import ArchivedPost, Group, Post
+
+ERROR_RATE = 0.01
+# Запас ёмкости под значения, добавленные до следующей перестройки.
+HEADROOM = 1.5
+FILTER_MAX_AGE = 60 * 60
+PULL_INTERVAL = 5
+# Записи журнала живут дольше фильтра, поэтому процесс, чей фильтр
+# ещё не устарел, не пропустит ни одной.
+LOG_TIMEOUT = FILTER_MAX_AGE * 2
+LOG_KEY = 'lookup_filter:{}:{}'
+HEAD_KEY = 'lookup_filter:{}:head'
+PULL_WINDOW = 100
+
+User = get_user_model()
+_filters = {}
+_lock = threading.Lock()
+
+
+class Filter:
+    def __init__(self, bloom, max_post_id=0, seen=0):
+        self.bloom = bloom
+        self.max_post_id = max_post_id
+        # Номер последней прочитанной записи журнала.
+        self.seen = seen
+        self.built_at = time.monotonic()
+        self.pulled_at = self.built_at
+
+
+def _values(model, field):
+    return model.objects.values_list(field, flat=True).order_by().iterator()
+
+
+def _sources():
+    return {
+        (Post, 'id'): lambda: chain(_values(Post, 'id'),
+                                    _values(ArchivedPost, 'id')),
+        (Group, 'slug'): lambda: _values(Group, 'slug'),
+        (User, 'username'): lambda: _values(User, 'username'),
+    }
+
+
+def _label(model):
+    return model._meta.label_lower
+
+
+def _read_log(model, start):
+    """Значения журнала после записи start и номер последней из них.
+
+    Записи до головы журнала могли быть вытеснены из кеша, пропуски на
+    них не останавливают чтение. После головы журнал читается, пока
+    записи идут подряд.
+    """
+    shared = caches['shared']
+    label = _label(model)
+    head = shared.get(HEAD_KEY.format(label)) or 0
+    values = []
+    while True:
+        numbers = range(start + 1, start + PULL_WINDOW + 1)
+        found = shared.get_many(
+            [LOG_KEY.format(label, number) for number in numbers])
+        for number in numbers:
+            key = LOG_KEY.format(label, number)
+            if key in found:
+                values.append(found[key])
+            elif number > head:
+                return values, start
+            start = number
+
+
+def build(model, field):
+    seen = 0
+    if model is not Post:
+        # Номер берётся до чтения базы: записи, появившиеся во время
+        # постройки, будут дочитаны из журнала ещё раз.
+        head = caches['shared'].get(HEAD_KEY.format(_label(model))) or 0
+        _, seen = _read_log(model, head)
+    values = list(_sources()[(model, field)]())
+    bloom = BloomFilter(int(len(values) * HEADROOM) + 100, ERROR_RATE)
+    for value in values:
+        bloom.add(value)
+    max_post_id = max(values) if model is Post and values else 0
+    return Filter(bloom, max_post_id, seen)
+
+
+def pull(model, state):
+    values, state.seen = _read_log(model, state.seen)
+    for value in values:
+        state.bloom.add(value)
+    state.pulled_at = time.monotonic()
+
+
+def current(model, field):
+    lookup = (model, field)
+    now = time.monotonic()
+    state = _filters.get(lookup)
+    if state is None or now - state.built_at > FILTER_MAX_AGE:
+        with _lock:
+            state = _filters.get(lookup)
+            if state is None or now - state.built_at > FILTER_MAX_AGE:
+                state = _filters[lookup] = build(model, field)
+    elif model is not Post and now - state.pulled_at > PULL_INTERVAL:
+        with _lock:
+            if now - state.pulled_at > PULL_INTERVAL:
+                pull(model, state)
+    return state
+
+
+def reset():
+    with _lock:
+        _filters.clear()
+
+
+def might_exist(model, field, value):
+    """False, только если объекта с таким значением поля точно нет."""
+    if (model, field) not in _sources():
+        return True
+    state = current(model, field)
+    if model is Post and value > state.max_post_id:
+        return True
+    return value in state.bloom
+
+
+def publish(model, value):
+    """Дописывает значение в журнал для остальных процессов."""
+    shared = caches['shared']
+    label = _label(model)
+    number = (shared.get(HEAD_KEY.format(label)) or 0) + 1
+    # add не перезапишет запись, занятую параллельной публикацией.
+    while not shared.add(LOG_KEY.format(label, number), value, LOG_TIMEOUT):
+        number += 1
+    shared.set(HEAD_KEY.format(label), number, None)
+
+
+def post_saved(sender, instance, **kwargs):
+    state = _filters.get((Post, 'id'))
+    if state is not None:
+        state.bloom.add(instance.id)
+
+
+def object_saved(sender, instance, update_fields=None, **kwargs):
+    field = 'slug' if sender is Group else 'username'
+    if update_fields is not None and field not in update_fields:
+        return
+    value = getattr(instance, field)
+    # Лишнее значение после отката даст только ложноположительный ответ.
+    state = _filters.get((sender, field))
+    if state is not None:
+        state.bloom.add(value)
+    transaction.on_commit(lambda: publish(sender, value))
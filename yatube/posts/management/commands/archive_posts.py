@@ -0,0 +1,53 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from posts.models import ArchivedComment, ArchivedPost, Comment, Post
+
+CHUNK_SIZE = 500
+POST_FIELDS = ('id', 'text', 'pub_date', 'author_id', 'group_id', 'image',
+               'last_comment_at', 'image_width', 'image_height',
+               'image_color', 'image_placeholder')
+COMMENT_FIELDS = ('id', 'post_id', 'author_id', 'text', 'created')
+
+
+def archive_chunk(ids):
+    """Переносит посты с комментариями в архив одной транзакцией."""
+    with transaction.atomic():
+        ArchivedPost.objects.bulk_create(
+            ArchivedPost(**values) for values in
+            Post.objects.filter(id__in=ids).values(*POST_FIELDS)
+        )
+        ArchivedComment.objects.bulk_create(
+            ArchivedComment(**values) for values in
+            Comment.objects.filter(post_id__in=ids).values(*COMMENT_FIELDS)
+        )
+        Post.objects.filter(id__in=ids).delete()
+
+
+class Command(BaseCommand):
+    help = 'Переносит старые посты и их комментарии в архивные таблицы'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='Архивировать посты старше указанного числа дней')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - datetime.timedelta(days=options['days'])
+        # Выданные id не переиспользуются (AUTOINCREMENT в SQLite,
+        # последовательности в PostgreSQL), поэтому архивировать можно все
+        # посты, новые id с архивными не совпадут.
+        candidates = Post.objects.filter(pub_date__lt=cutoff).order_by('id')
+        archived = 0
+        while True:
+            ids = list(candidates.values_list('id', flat=True)
+                       [:options['chunk_size']])
+            if not ids:
+                break
+            archive_chunk(ids)
+            archived += len(ids)
+        self.stdout.write(f'Перенесено в архив постов: {archived}')
@@ -0,0 +1,69 @@
+from collections import Counter, defaultdict
+from itertools import chain
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Follow, FollowSummary
+
+CHUNK_SIZE = 10000
+SUGGESTIONS_NUM = 5
+
+
+def follow_edges(chunk_size):
+    """Пары (user_id, author_id) порциями по chunk_size строк."""
+    last_id = 0
+    while True:
+        chunk = list(
+            Follow.objects.filter(id__gt=last_id).order_by('id')
+            .values_list('id', 'user_id', 'author_id')[:chunk_size]
+        )
+        if not chunk:
+            return
+        last_id = chunk[-1][0]
+        yield [(user_id, author_id) for _, user_id, author_id in chunk]
+
+
+def suggest(user_id, followees, limit):
+    """Друзья друзей: авторы, на которых подписаны те, на кого
+    подписан user_id, по убыванию числа таких путей."""
+    own = followees[user_id]
+    candidates = Counter(chain.from_iterable(
+        followees.get(author_id, ()) for author_id in own
+    ))
+    for author_id in own | {user_id}:
+        candidates.pop(author_id, None)
+    return [author_id for author_id, _ in candidates.most_common(limit)]
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает число подписчиков, подписок и рекомендации '
+            'авторов в таблице FollowSummary')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        followees = defaultdict(set)
+        followers_count = Counter()
+        for chunk in follow_edges(options['chunk_size']):
+            for user_id, author_id in chunk:
+                followees[user_id].add(author_id)
+            followers_count.update(author_id for _, author_id in chunk)
+        summaries = [
+            FollowSummary(
+                user_id=user_id,
+                followers_count=followers_count[user_id],
+                following_count=len(followees.get(user_id, ())),
+                suggestions=','.join(
+                    str(author_id) for author_id
+                    in suggest(user_id, followees, SUGGESTIONS_NUM)
+                ) if user_id in followees else '',
+            )
+            for user_id in set(followees) | set(followers_count)
+        ]
+        with transaction.atomic():
+            FollowSummary.objects.all().delete()
+            FollowSummary.objects.bulk_create(
+                summaries, batch_size=options['chunk_size'])
+        self.stdout.write(f'Пересчитано пользователей: {len(summaries)}')
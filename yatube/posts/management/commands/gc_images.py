@@ -0,0 +1,54 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from posts.models import ArchivedPost, Post
+from posts.storage import content_storage
+
+UPLOAD_DIR = Post._meta.get_field('image').upload_to
+
+
+class Command(BaseCommand):
+    help = ('Удаляет картинки, на которые не ссылается ни один пост, '
+            'вместе с их миниатюрами')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=60 * 60,
+            help='Не трогать файлы моложе указанного числа секунд')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено')
+
+    def unreferenced(self, grace):
+        referenced = set()
+        for model in (Post, ArchivedPost):
+            referenced.update(
+                model.objects.exclude(image='')
+                .values_list('image', flat=True).iterator()
+            )
+        cutoff = time.time() - grace
+        root = content_storage.path(UPLOAD_DIR)
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, content_storage.location)
+                name = name.replace(os.sep, '/')
+                if name in referenced or os.path.getmtime(path) > cutoff:
+                    continue
+                yield name
+
+    def handle(self, *args, **options):
+        removed = 0
+        for name in self.unreferenced(options['grace']):
+            removed += 1
+            if options['dry_run']:
+                self.stdout.write(name)
+                continue
+            image_file = ImageFile(name, content_storage)
+            default.kvstore.delete(image_file)
+            image_file.delete()
+        self.stdout.write(f'Удалено файлов: {removed}')
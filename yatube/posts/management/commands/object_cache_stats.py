@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import object_cache
+
+
+class Command(BaseCommand):
+    help = 'Попадания и промахи кеша объектов Post, Group и User'
+
+    def handle(self, *args, **options):
+        for model in object_cache.CACHED_FIELDS:
+            counters = object_cache.stats(model)
+            total = counters['hits'] + counters['misses']
+            ratio = counters['hits'] / total if total else 0
+            self.stdout.write(
+                f'{model._meta.label}: hits={counters["hits"]}, '
+                f'misses={counters["misses"]}, hit_ratio={ratio:.2f}'
+            )
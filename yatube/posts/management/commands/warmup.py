@@ -0,0 +1,117 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from io import BytesIO
+from urllib.request import urlopen
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.handlers.base import BaseHandler
+from django.core.management.base import BaseCommand
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+
+from posts.models import Post
+from posts.presenters import thumbnail_url
+from posts.url_builder import fast_url
+
+HTTP_TIMEOUT = 30
+# Кеш этих бэкендов виден только своему процессу.
+PROCESS_LOCAL_CACHES = (DummyCache, LocMemCache)
+
+_handler = None
+
+
+def get_handler():
+    """Обработчик запросов со всеми middleware, как у WSGI-сервера."""
+    global _handler
+    if _handler is None:
+        _handler = BaseHandler()
+        _handler.load_middleware()
+    return _handler
+
+
+def render_page(url, base_url=None):
+    if base_url:
+        try:
+            with urlopen(base_url.rstrip('/') + url,
+                         timeout=HTTP_TIMEOUT) as response:
+                return response.status == 200
+        except OSError:
+            return False
+    path, _, query = url.partition('?')
+    request = WSGIRequest({
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'wsgi.input': BytesIO(),
+        'wsgi.url_scheme': 'http',
+    })
+    response = get_handler().get_response(request)
+    response.close()
+    return response.status_code == 200
+
+
+def pages_cache_is_shared():
+    """Попадёт ли отрендеренная здесь страница в кеш сервера."""
+    return not isinstance(caches['default'], PROCESS_LOCAL_CACHES)
+
+
+def render_thumbnail(post_id):
+    post = Post.objects.only('image').get(pk=post_id)
+    return thumbnail_url(post.image) is not None
+
+
+class Command(BaseCommand):
+    help = ('Прогревает кеш главной и миниатюр после деплоя. Остальные '
+            'страницы не кешируются целиком, их прогревать незачем. С '
+            '--base-url страницы запрашиваются у запущенного сервера по '
+            'HTTP, иначе рендерятся в этом процессе, но только при общем '
+            'бэкенде кеша default: кеш в памяти процесса серверу не '
+            'виден. Миниатюры пишутся на диск и прогреваются всегда.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=5,
+                            help='Сколько первых страниц главной')
+        parser.add_argument('--thumbnails', type=int, default=100,
+                            help='Для скольких последних постов')
+        parser.add_argument('--base-url', default=None,
+                            help='Адрес сайта, например http://localhost')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Число процессов; 0 — без пула')
+
+    def urls(self, options):
+        index = fast_url('posts:index')
+        return [index] + [f'{index}?page={page}'
+                          for page in range(2, options['pages'] + 1)]
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        urls = self.urls(options)
+        total = len(urls)
+        if not options['base_url'] and not pages_cache_is_shared():
+            self.stderr.write('Кеш default локален для процесса, страницы '
+                              'не прогреваются; укажите --base-url.')
+            urls = []
+        fetch = partial(render_page, base_url=options['base_url'])
+        post_ids = list(
+            Post.objects.exclude(image='').order_by('-pub_date')
+            .values_list('id', flat=True)[:options['thumbnails']]
+        )
+        if options['workers'] == 0:
+            pages = sum(map(fetch, urls))
+            thumbnails = sum(map(render_thumbnail, post_ids))
+        else:
+            # Дочерние процессы не должны делить соединения с родителем.
+            connections.close_all()
+            with ProcessPoolExecutor(options['workers']) as pool:
+                pages = sum(pool.map(fetch, urls))
+                thumbnails = sum(pool.map(render_thumbnail, post_ids))
+        self.stdout.write(
+            f'Страниц: {pages} из {total}, '
+            f'миниатюр: {thumbnails} из {len(post_ids)}, '
+            f'время: {time.perf_counter() - start:.2f} с'
+        )
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0008_post_image_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='follow_summary', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+                ('suggestions', models.CharField(blank=True, help_text='id рекомендуемых авторов через запятую', max_length=200, verbose_name='Рекомендации')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Дата пересчёта')),
+            ],
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:35
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def fill_activity(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.order_by().annotate(last=Max('comments__created'))
+    for post in posts.filter(last__isnull=False).iterator():
+        Post.objects.filter(pk=post.pk).update(last_comment_at=post.last)
+    groups = Group.objects.order_by().annotate(
+        count=Count('posts', distinct=True),
+        last_post=Max('posts__pub_date'),
+        last_comment=Max('posts__comments__created'),
+    )
+    for group in groups.iterator():
+        Group.objects.filter(pk=group.pk).update(
+            post_count=group.count,
+            last_post_at=group.last_post,
+            last_comment_at=group.last_comment,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_followsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='last_comment_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Last comment'),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='last_post_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Last post'),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Post count'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='last_comment_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Последний комментарий'),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['-last_post_at'], name='group_last_post_idx'),
+        ),
+        migrations.RunPython(fill_activity, migrations.RunPython.noop),
+    ]
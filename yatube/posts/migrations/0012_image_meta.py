@@ -0,0 +1,98 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:50
+
+from base64 import b64encode
+from io import BytesIO
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import migrations, models
+from PIL import Image, ImageOps
+
+# Копия posts.image_meta на момент миграции: её изменения не должны
+# менять уже написанную миграцию.
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_QUALITY = 40
+PALETTE_COLORS = 8
+
+
+def describe(file):
+    file.seek(0)
+    with Image.open(file) as source:
+        image = ImageOps.exif_transpose(source).convert('RGB')
+    width, height = image.size
+    image.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    output = BytesIO()
+    image.save(output, 'JPEG', quality=PLACEHOLDER_QUALITY)
+    quantized = image.quantize(PALETTE_COLORS)
+    _, index = max(quantized.getcolors())
+    red, green, blue = quantized.getpalette()[index * 3:index * 3 + 3]
+    return {
+        'image_width': width,
+        'image_height': height,
+        'image_color': f'#{red:02x}{green:02x}{blue:02x}',
+        'image_placeholder': ('data:image/jpeg;base64,'
+                              + b64encode(output.getvalue()).decode()),
+    }
+
+
+def fill_image_meta(apps, schema_editor):
+    for name in ('Post', 'ArchivedPost'):
+        model = apps.get_model('posts', name)
+        for post in model.objects.exclude(image='').iterator():
+            try:
+                with post.image.open('rb') as file:
+                    meta = describe(file)
+            except (OSError, ValueError, SuspiciousFileOperation):
+                # Файл пропал или не читается: поля остаются пустыми.
+                continue
+            model.objects.filter(pk=post.pk).update(**meta)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedpost',
+            name='image_color',
+            field=models.CharField(blank=True, editable=False, max_length=7, verbose_name='Основной цвет картинки'),
+        ),
+        migrations.AddField(
+            model_name='archivedpost',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Высота картинки'),
+        ),
+        migrations.AddField(
+            model_name='archivedpost',
+            name='image_placeholder',
+            field=models.TextField(blank=True, editable=False, help_text='Крошечная копия картинки в data URI', verbose_name='Заглушка картинки'),
+        ),
+        migrations.AddField(
+            model_name='archivedpost',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина картинки'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_color',
+            field=models.CharField(blank=True, editable=False, max_length=7, verbose_name='Основной цвет картинки'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Высота картинки'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_placeholder',
+            field=models.TextField(blank=True, editable=False, help_text='Крошечная копия картинки в data URI', verbose_name='Заглушка картинки'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина картинки'),
+        ),
+        migrations.RunPython(fill_image_meta, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,14 @@
+import logging
+
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import models, transaction
+
+from . import image_meta
+from .archive import ArchiveFeed
+from .storage import content_storage
+
+logger = logging.getLogger(__name__)
 
 User = get_user_model()
 TEXT_NUM = 15
@@ -9,11 +18,31 @@ class Group(models.Model):
     title = models.CharField("Group name", max_length=200)
     slug = models.SlugField("Slug", unique=True)
     description = models.TextField("Description group")
+    post_count = models.PositiveIntegerField("Post count", default=0)
+    last_post_at = models.DateTimeField("Last post", null=True, blank=True)
+    last_comment_at = models.DateTimeField(
+        "Last comment", null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-last_post_at'],
+                         name='group_last_post_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
 
+class PostManager(models.Manager):
+    def with_archive(self, **filters):
+        """Посты по фильтру вместе с архивными, по убыванию даты."""
+        related = ('author', 'group')
+        return ArchiveFeed(
+            self.filter(**filters).select_related(*related),
+            ArchivedPost.objects.filter(**filters).select_related(*related),
+        )
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст поста',
@@ -37,12 +66,62 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=content_storage,
         blank=True
     )
+    last_comment_at = models.DateTimeField(
+        'Последний комментарий',
+        null=True,
+        blank=True)
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки', null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(
+        'Высота картинки', null=True, blank=True, editable=False)
+    image_color = models.CharField(
+        'Основной цвет картинки', max_length=7, blank=True, editable=False)
+    image_placeholder = models.TextField(
+        'Заглушка картинки', blank=True, editable=False,
+        help_text='Крошечная копия картинки в data URI')
+
+    objects = PostManager()
 
     def __str__(self):
         return self.text[:TEXT_NUM]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        post = super().from_db(db, field_names, values)
+        # Группа на момент загрузки: при смене группы счётчики
+        # пересчитываются и у старой, и у новой (см. posts.activity).
+        post.loaded_group_id = post.__dict__.get('group_id')
+        post.loaded_image = post.__dict__.get('image')
+        return post
+
+    def update_image_meta(self):
+        """Заполняет поля image_* при смене картинки."""
+        self.image_changed = (
+            self.image.name != getattr(self, 'loaded_image', None))
+        if not self.image_changed:
+            return
+        self.image_width = self.image_height = None
+        self.image_color = self.image_placeholder = ''
+        if self.image:
+            try:
+                meta = image_meta.describe(self.image)
+            except (OSError, ValueError, SuspiciousFileOperation):
+                # Нечитаемая картинка выводится без заглушки.
+                logger.warning('Cannot read image %s', self.image.name)
+                return
+            for field, value in meta.items():
+                setattr(self, field, value)
+
+    def save(self, *args, **kwargs):
+        self.update_image_meta()
+        # post_save обновляет счётчики группы в той же транзакции.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self.loaded_image = self.image.name
+
     class Meta:
         ordering = ["-pub_date"]
 
@@ -67,6 +146,68 @@ class Comment(models.Model):
         'Дата публикации',
         auto_now_add=True)
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class ArchivedPost(models.Model):
+    """Пост, перенесённый из Post командой archive_posts."""
+    text = models.TextField('Текст поста', max_length=1000)
+    pub_date = models.DateTimeField('Дата публикации', db_index=True)
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+        verbose_name='Автор'
+    )
+    group = models.ForeignKey(
+        'group', blank=True, null=True,
+        related_name='archived_posts',
+        on_delete=models.SET_NULL,
+        verbose_name="Группа")
+    image = models.ImageField(
+        'Картинка',
+        upload_to='posts/',
+        storage=content_storage,
+        blank=True
+    )
+    last_comment_at = models.DateTimeField(
+        'Последний комментарий',
+        null=True,
+        blank=True)
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки', null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(
+        'Высота картинки', null=True, blank=True, editable=False)
+    image_color = models.CharField(
+        'Основной цвет картинки', max_length=7, blank=True, editable=False)
+    image_placeholder = models.TextField(
+        'Заглушка картинки', blank=True, editable=False,
+        help_text='Крошечная копия картинки в data URI')
+
+    def __str__(self):
+        return self.text[:TEXT_NUM]
+
+    class Meta:
+        ordering = ["-pub_date"]
+
+
+class ArchivedComment(models.Model):
+    post = models.ForeignKey(
+        'ArchivedPost',
+        on_delete=models.CASCADE,
+        related_name='comments',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments',
+        verbose_name='Автор'
+    )
+    text = models.TextField('Текст комментария', max_length=1000)
+    created = models.DateTimeField('Дата публикации')
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -79,3 +220,27 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='following'
     )
+
+
+class FollowSummary(models.Model):
+    """Счётчики подписок и рекомендации, пересчитываемые командой
+    build_follow_summary."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='follow_summary',
+        verbose_name='Пользователь'
+    )
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+    suggestions = models.CharField(
+        'Рекомендации',
+        max_length=200,
+        blank=True,
+        help_text='id рекомендуемых авторов через запятую')
+    updated = models.DateTimeField('Дата пересчёта', auto_now=True)
+
+    @property
+    def suggested_ids(self):
+        return [int(pk) for pk in self.suggestions.split(',') if pk]
@@ -0,0 +1,108 @@
+"""Кеш объектов Post, Group и User со сквозным чтением.
+
+Сам объект хранится под ключом первичного ключа, остальные уникальные
+поля из CACHED_FIELDS указывают на первичный ключ. Записи объекта
+удаляются при сохранении и удалении (обработчики подключаются в
+PostsConfig.ready) и ещё раз после коммита; оставшийся после
+переименования указатель со старым значением отбрасывается сверкой
+поля у найденного объекта.
+"""
+from urllib.parse import quote
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+
+from core import metrics
+
+from . import lookup_filter
+from .models import Group, Post
+
+OBJECT_TIMEOUT = 60 * 10
+# Пользователя читает каждый запрос при проверке сессии, и смена пароля
+# или is_active в другом процессе должна подействовать быстро.
+USER_TIMEOUT = 30
+OBJECT_KEY = 'objects:{}:{}:{}'
+CACHED_FIELDS = {
+    Post: (),
+    Group: ('slug',),
+    get_user_model(): ('username',),
+}
+TIMEOUTS = {get_user_model(): USER_TIMEOUT}
+
+
+def _key(model, field, value):
+    return OBJECT_KEY.format(model._meta.label_lower, field,
+                             quote(str(value)))
+
+
+def _name(model):
+    return f'objects:{model._meta.label_lower}'
+
+
+def _lookup_ids(model, field, values):
+    if field in ('pk', 'id'):
+        return {value: value for value in values}
+    keys = {_key(model, field, value): value for value in values}
+    return {keys[key]: pk for key, pk in cache.get_many(list(keys)).items()}
+
+
+def get_many(model, field, values):
+    """Словарь значение поля -> объект; отсутствующих в базе нет."""
+    attname = 'pk' if field == 'id' else field
+    ids = _lookup_ids(model, field, values)
+    keys = {_key(model, 'pk', pk): value for value, pk in ids.items()}
+    found = {
+        keys[key]: obj
+        for key, obj in cache.get_many(list(keys)).items()
+        if str(getattr(obj, attname)) == str(keys[key])
+    }
+    missing = [value for value in values if value not in found]
+    if found:
+        metrics.incr(_name(model), 'hits', len(found))
+    if missing:
+        metrics.incr(_name(model), 'misses', len(missing))
+        loaded = model._default_manager.filter(**{f'{field}__in': missing})
+        to_cache = {}
+        for obj in loaded:
+            found[getattr(obj, attname)] = obj
+            to_cache[_key(model, 'pk', obj.pk)] = obj
+            for cached_field in CACHED_FIELDS[model]:
+                to_cache[_key(model, cached_field,
+                              getattr(obj, cached_field))] = obj.pk
+        cache.set_many(to_cache, TIMEOUTS.get(model, OBJECT_TIMEOUT))
+    return found
+
+
+def get(model, field, value):
+    return get_many(model, field, [value]).get(value)
+
+
+def get_or_404(model, field, value):
+    obj = None
+    if lookup_filter.might_exist(model, field, value):
+        obj = get(model, field, value)
+    if obj is None:
+        raise Http404(f'No {model._meta.object_name} matches the query.')
+    return obj
+
+
+def stats(model):
+    return metrics.read(_name(model), ('hits', 'misses'))
+
+
+def object_changed(sender, instance, **kwargs):
+    keys = [_key(sender, 'pk', instance.pk)] + [
+        _key(sender, field, getattr(instance, field))
+        for field in CACHED_FIELDS[sender]
+    ]
+    cache.delete_many(keys)
+    # Параллельный запрос мог до коммита снова положить в кеш старую
+    # строку, поэтому после коммита записи удаляются ещё раз.
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate(model, pks):
+    """Сбрасывает объекты, изменённые в обход save (update, delete)."""
+    cache.delete_many([_key(model, 'pk', pk) for pk in pks])
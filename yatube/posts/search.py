@@ -0,0 +1,46 @@
+"""Полнотекстовый поиск по тексту постов.
+
+На SQLite миграция 0013 создаёт таблицу FTS5 posts_post_fts, которую
+триггеры держат в согласии с posts_post. Поиск по ней идёт по индексу,
+а не сканированием LIKE '%...%'. На других базах и в SQLite, собранном
+без FTS5, таблицы нет, поиск возвращает None, и вызывающий код
+использует обычный поиск.
+
+Триггеры создаются вручную: если будущая миграция перестроит таблицу
+posts_post на SQLite (изменение поля), их нужно создать заново. Их
+наличие после всех миграций проверяет тест в posts/tests/test_admin.py.
+"""
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'posts_post_fts'
+
+
+_available = {}
+
+
+def fts_available():
+    """Есть ли таблица FTS; проверяется один раз для каждой базы."""
+    name = connection.settings_dict['NAME']
+    if name not in _available:
+        _available[name] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names())
+    return _available[name]
+
+
+def match_expression(term):
+    """Запрос FTS5: все слова, каждое как префикс."""
+    words = term.split()
+    return ' '.join('"{}"*'.format(word.replace('"', '""'))
+                    for word in words)
+
+
+def search_posts(queryset, term):
+    """Посты queryset, содержащие все слова term, или None без FTS."""
+    if not term.strip() or not fts_available():
+        return None
+    return queryset.filter(id__in=RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [match_expression(term)],
+    ))
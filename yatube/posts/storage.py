@@ -0,0 +1,57 @@
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+CHUNK_SIZE = 64 * 1024
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит каждый файл один раз под именем sha256 его содержимого.
+
+    Одинаковые загрузки получают одно имя, поэтому посты делят и сам
+    файл, и миниатюры sorl.thumbnail, построенные по этому имени.
+    """
+
+    def blob_name(self, name, digest):
+        directory = posixpath.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return posixpath.join(directory, digest[:2], digest + extension)
+
+    def get_available_name(self, name, max_length=None):
+        # Имя определяется содержимым, суффиксы для уникальности не нужны.
+        return name
+
+    def _save(self, name, content):
+        os.makedirs(self.location, exist_ok=True)
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(dir=self.location,
+                                         delete=False) as spool:
+            if hasattr(content, 'seek'):
+                content.seek(0)
+            for chunk in content.chunks(CHUNK_SIZE):
+                digest.update(chunk)
+                spool.write(chunk)
+        name = self.blob_name(name, digest.hexdigest())
+        full_path = self.path(name)
+        try:
+            # Свежий mtime не даёт gc_images удалить файл, на который
+            # вот-вот сошлётся новый пост.
+            os.utime(full_path)
+        except FileNotFoundError:
+            pass
+        else:
+            os.remove(spool.name)
+            return name
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        os.replace(spool.name, full_path)
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        return name
+
+
+content_storage = ContentAddressedStorage()
@@ -0,0 +1,16 @@
+from django import template
+
+from posts import image_transforms, url_builder
+
+register = template.Library()
+
+
+@register.simple_tag
+def fast_url(viewname, *args):
+    return url_builder.fast_url(viewname, *args)
+
+
+@register.simple_tag
+def image_url(post, width, height, crop='center', ext='jpg'):
+    """Подписанный адрес картинки поста нужного размера."""
+    return image_transforms.image_url(post.pk, width, height, crop, ext)
@@ -0,0 +1,120 @@
+from unittest import mock
+
+from django.contrib.admin import helpers
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from core import jobs
+from core.paginator import EstimatedCountPaginator
+from posts import search
+from posts.admin import PostAdmin
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class PostAdminTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(
+            'admin', 'admin@yatube.ru', 'password')
+        self.client.force_login(self.admin)
+        self.author = User.objects.create_user(username='Author')
+        self.source = Group.objects.create(
+            title='Откуда', slug='source', description='Описание')
+        self.target = Group.objects.create(
+            title='Куда', slug='target', description='Описание')
+        self.posts = [
+            Post.objects.create(author=self.author, group=self.source,
+                                text=f'Пост номер {number}')
+            for number in range(5)
+        ]
+        self.url = reverse('admin:posts_post_changelist')
+
+    def test_paginator_estimates_large_counts(self):
+        """Сверх exact_limit число строк оценивается по первичным ключам."""
+        paginator = EstimatedCountPaginator(Post.objects.all(), 2)
+        self.assertEqual(paginator.count, 5)
+        paginator = EstimatedCountPaginator(Post.objects.all(), 2)
+        paginator.exact_limit = 3
+        Post.objects.filter(pk=self.posts[2].pk).delete()
+        self.assertEqual(paginator.count, 5)
+
+    def test_filtered_count_is_not_estimated(self):
+        """Отфильтрованный список не оценивается по всей таблице."""
+        paginator = EstimatedCountPaginator(
+            Post.objects.filter(text__startswith='Пост'), 2)
+        paginator.exact_limit = 3
+        self.assertEqual(paginator.count, 4)
+        self.assertTrue(paginator.truncated)
+
+    def test_truncated_changelist_has_no_last_pages(self):
+        """При усечённом подсчёте нет ссылок на последние страницы."""
+        for number in range(10):
+            Post.objects.create(author=self.author, text=f'Ещё пост {number}')
+        with mock.patch.object(EstimatedCountPaginator, 'exact_limit', 12), \
+                mock.patch.object(PostAdmin, 'list_per_page', 1):
+            response = self.client.get(self.url, {'author__id__exact':
+                                                  self.author.pk})
+        self.assertContains(response, '12+ ')
+        self.assertNotContains(response, 'class="end"')
+
+    def test_search_uses_full_text_index(self):
+        """Поиск находит посты по началу слова без учёта регистра."""
+        self.posts[0].text = 'Котики и СОБАКИ'
+        self.posts[0].save()
+        found = search.search_posts(Post.objects.all(), 'собак')
+        self.assertEqual(list(found), [self.posts[0]])
+        response = self.client.get(self.url, {'q': 'собак'})
+        self.assertEqual(list(response.context['cl'].result_list),
+                         [self.posts[0]])
+
+    def test_full_text_triggers_survive_migrations(self):
+        """После всех миграций триггеры FTS на месте.
+
+        Перестройка posts_post на SQLite молча удаляет триггеры, и индекс
+        перестаёт обновляться.
+        """
+        if not search.fts_available():
+            self.skipTest('SQLite собран без FTS5')
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master "
+                           "WHERE type = 'trigger' AND tbl_name = %s",
+                           [Post._meta.db_table])
+            triggers = {name for name, in cursor.fetchall()}
+        self.assertLessEqual({'posts_post_fts_ai', 'posts_post_fts_ad',
+                              'posts_post_fts_au'}, triggers)
+
+    def test_move_to_group_runs_in_batches(self):
+        """Перенос в группу выполняется задачами очереди."""
+        response = self.client.post(self.url, {
+            'action': 'move_to_group',
+            'index': 0,
+            'group': self.target.pk,
+            helpers.ACTION_CHECKBOX_NAME: [post.pk for post in self.posts],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.target.posts.count(), 0)
+        jobs.run_pending()
+        self.assertEqual(self.target.posts.count(), 5)
+        self.target.refresh_from_db()
+        self.source.refresh_from_db()
+        self.assertEqual((self.source.post_count, self.target.post_count),
+                         (0, 5))
+
+    def test_delete_in_batches_asks_for_confirmation(self):
+        """Удаление пакетами требует подтверждения."""
+        data = {
+            'action': 'delete_in_batches',
+            'index': 0,
+            helpers.ACTION_CHECKBOX_NAME: [self.posts[0].pk],
+        }
+        response = self.client.post(self.url, data)
+        self.assertContains(response, 'Будет удалено постов: 1')
+        self.client.post(self.url, {**data, 'confirm': 'yes'})
+        jobs.run_pending()
+        self.assertFalse(Post.objects.filter(pk=self.posts[0].pk).exists())
+        self.assertEqual(Post.objects.count(), 4)
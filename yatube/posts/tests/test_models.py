@@ -1,7 +1,13 @@
+import datetime
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
 
-from ..models import Group, Post
+from ..models import ArchivedComment, ArchivedPost, Comment, Group, Post
 
 User = get_user_model()
 
@@ -56,3 +62,111 @@ class PostModelTest(TestCase):
         group = PostModelTest.group
         expected_object_name = group.title
         self.assertEqual(expected_object_name, str(group))
+
+
+class GroupActivityTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.quiet = Group.objects.create(title='Тихая', slug='quiet',
+                                          description='Описание')
+        self.busy = Group.objects.create(title='Активная', slug='busy',
+                                         description='Описание')
+
+    def test_post_count_and_last_post(self):
+        """Счётчики группы меняются при создании, переносе и удалении."""
+        post = Post.objects.create(author=self.user, text='Пост',
+                                   group=self.busy)
+        self.busy.refresh_from_db()
+        self.assertEqual(self.busy.post_count, 1)
+        self.assertEqual(self.busy.last_post_at, post.pub_date)
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.quiet
+        post.save()
+        self.busy.refresh_from_db()
+        self.quiet.refresh_from_db()
+        self.assertEqual(self.busy.post_count, 0)
+        self.assertIsNone(self.busy.last_post_at)
+        self.assertEqual(self.quiet.post_count, 1)
+        post.delete()
+        self.quiet.refresh_from_db()
+        self.assertEqual(self.quiet.post_count, 0)
+
+    def test_last_comment_at(self):
+        """Комментарий обновляет last_comment_at поста и группы."""
+        post = Post.objects.create(author=self.user, text='Пост',
+                                   group=self.busy)
+        comment = Comment.objects.create(post=post, author=self.user,
+                                         text='Комментарий')
+        post.refresh_from_db()
+        self.busy.refresh_from_db()
+        self.assertEqual(post.last_comment_at, comment.created)
+        self.assertEqual(self.busy.last_comment_at, comment.created)
+
+    def test_group_index_sorted_by_activity(self):
+        """Каталог групп отсортирован по последнему посту одним запросом."""
+        Post.objects.create(author=self.user, text='Пост', group=self.quiet)
+        Post.objects.create(author=self.user, text='Пост', group=self.busy)
+        response = self.client.get(reverse('posts:group_index'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.busy, self.quiet])
+
+
+class ArchiveTest(TestCase):
+    POST_NUM = 15
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.group = Group.objects.create(title='Группа', slug='group',
+                                          description='Описание')
+        now = timezone.now() + datetime.timedelta(hours=12)
+        for i in range(self.POST_NUM):
+            post = Post.objects.create(author=self.user, text=f'Пост {i}',
+                                       group=self.group)
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=now - datetime.timedelta(days=self.POST_NUM - i))
+        self.old_post = Post.objects.order_by('pub_date').first()
+        Comment.objects.create(post=self.old_post, author=self.user,
+                               text='Комментарий')
+
+    def test_archive_moves_old_posts(self):
+        """Старые посты и комментарии переносятся в архив."""
+        call_command('archive_posts', days=5, chunk_size=4,
+                     stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(ArchivedPost.objects.count(), self.POST_NUM - 5)
+        self.assertEqual(ArchivedComment.objects.get().post_id,
+                         self.old_post.pk)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_new_post_ids_do_not_repeat_archived(self):
+        """После архивации всех постов новые получают новые id."""
+        call_command('archive_posts', days=-1, stdout=StringIO())
+        self.assertFalse(Post.objects.exists())
+        post = Post.objects.create(author=self.user, text='Новый')
+        self.assertFalse(ArchivedPost.objects.filter(pk=post.pk).exists())
+
+    def test_feed_pages_read_archive(self):
+        """Страницы группы и профиля продолжаются архивными постами."""
+        expected = list(Post.objects.filter(group=self.group)
+                        .values_list('pk', flat=True))
+        call_command('archive_posts', days=5, stdout=StringIO())
+        pages = []
+        for page in (1, 2):
+            response = self.client.get(
+                reverse('posts:group_posts', args=[self.group.slug]),
+                {'page': page})
+            pages += [post.pk for post in response.context['page_obj']]
+        self.assertEqual(pages, expected)
+        response = self.client.get(
+            reverse('posts:profile', args=[self.user.username]))
+        self.assertEqual(response.context['post_count'], self.POST_NUM)
+
+    def test_archived_post_detail(self):
+        """Архивный пост открывается без формы комментария."""
+        call_command('archive_posts', days=5, stdout=StringIO())
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.old_post.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['archived'])
+        self.assertEqual(len(response.context['comments']), 1)
@@ -0,0 +1,184 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from posts import lookup_filter, object_cache
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ObjectCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Author')
+        self.group = Group.objects.create(
+            title='Группа',
+            slug='group',
+            description='Описание',
+        )
+        self.post = Post.objects.create(author=self.user, text='Пост')
+
+    def test_second_read_hits_cache(self):
+        """Повторное чтение объекта не обращается к базе."""
+        # stats сбрасывает накопленные счётчики, следующий сброс нескоро.
+        before = object_cache.stats(Post)
+        object_cache.get(Post, 'id', self.post.id)
+        with self.assertNumQueries(0):
+            post = object_cache.get(Post, 'id', self.post.id)
+        self.assertEqual(post, self.post)
+        after = object_cache.stats(Post)
+        self.assertEqual(after['hits'] - before['hits'], 1)
+        self.assertEqual(after['misses'] - before['misses'], 1)
+
+    def test_save_invalidates(self):
+        """Сохранение объекта сбрасывает его запись в кеше."""
+        object_cache.get(Post, 'id', self.post.id)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        post = object_cache.get(Post, 'id', self.post.id)
+        self.assertEqual(post.text, 'Новый текст')
+
+    def test_renamed_slug_is_not_served(self):
+        """По старому slug переименованная группа не находится."""
+        object_cache.get(Group, 'slug', 'group')
+        self.group.slug = 'renamed'
+        self.group.save()
+        self.assertIsNone(object_cache.get(Group, 'slug', 'group'))
+
+    def test_edit_keeps_fields_updated_past_cache(self):
+        """Правка поста не откатывает поля, изменённые через update()."""
+        object_cache.get(Post, 'id', self.post.id)
+        comment = Comment.objects.create(post=self.post, author=self.user,
+                                         text='Комментарий')
+        self.client.force_login(self.user)
+        self.client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+            {'text': 'Новый текст'})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'Новый текст')
+        self.assertEqual(self.post.last_comment_at, comment.created)
+
+    def test_get_many_loads_missing_in_one_query(self):
+        """Недостающие объекты загружаются одним запросом."""
+        other = User.objects.create_user(username='Other')
+        object_cache.get(User, 'id', self.user.id)
+        with self.assertNumQueries(1):
+            users = object_cache.get_many(
+                User, 'id', [self.user.id, other.id, 0])
+        self.assertEqual(users, {self.user.id: self.user, other.id: other})
+
+
+class ObjectCacheCommitTests(TransactionTestCase):
+    def tearDown(self):
+        cache.clear()
+
+    def test_row_cached_before_commit_is_dropped(self):
+        """Старая строка, закешированная до коммита, после него сброшена."""
+        user = User.objects.create_user(username='Author')
+        post = Post.objects.create(author=user, text='Пост')
+        stale = object_cache.get(Post, 'id', post.id)
+        with transaction.atomic():
+            post.text = 'Новый текст'
+            post.save()
+            # Параллельный запрос ещё видит старую строку и кеширует её.
+            cache.set(object_cache._key(Post, 'pk', post.id), stale)
+        self.assertEqual(object_cache.get(Post, 'id', post.id).text,
+                         'Новый текст')
+
+
+class LookupFilterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Author')
+        self.post = Post.objects.create(author=self.user, text='Пост')
+
+    def test_missing_profile_skips_database(self):
+        """Несуществующий профиль отдаёт 404 без запросов к базе."""
+        self.client.get('/profile/nobody/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/profile/nobody-else/')
+        self.assertEqual(response.status_code, 404)
+        self.assertContains(response, '/profile/nobody-else/',
+                            status_code=404)
+
+    def test_new_objects_are_found(self):
+        """Созданные после постройки фильтра объекты находятся."""
+        self.client.get('/profile/nobody/')
+        User.objects.create_user(username='Newcomer')
+        post = Post.objects.create(author=self.user, text='Новый')
+        self.assertEqual(
+            self.client.get('/profile/Newcomer/').status_code, 200)
+        self.assertEqual(
+            self.client.get(f'/posts/{post.id}/').status_code, 200)
+
+    def test_names_published_by_other_process_are_found(self):
+        """Имя из журнала другого процесса попадает в фильтр без
+        перестройки."""
+        state = lookup_filter.current(User, 'username')
+        self.assertFalse(
+            lookup_filter.might_exist(User, 'username', 'Remote'))
+        lookup_filter.publish(User, 'Remote')
+        state.pulled_at -= lookup_filter.PULL_INTERVAL + 1
+        self.assertTrue(
+            lookup_filter.might_exist(User, 'username', 'Remote'))
+        self.assertIs(lookup_filter.current(User, 'username'), state)
+
+    def test_pull_skips_evicted_log_entries(self):
+        """Вытесненная запись журнала не прячет записи после неё."""
+        state = lookup_filter.current(User, 'username')
+        for name in ('First', 'Evicted', 'Last'):
+            lookup_filter.publish(User, name)
+        head = caches['shared'].get(lookup_filter.HEAD_KEY.format(
+            'auth.user'))
+        caches['shared'].delete(
+            lookup_filter.LOG_KEY.format('auth.user', head - 1))
+        state.pulled_at -= lookup_filter.PULL_INTERVAL + 1
+        self.assertTrue(
+            lookup_filter.might_exist(User, 'username', 'Last'))
+        self.assertEqual(state.seen, head)
+
+    def test_group_save_keeps_post_filter(self):
+        """Сохранение группы не перестраивает фильтр постов."""
+        posts = lookup_filter.current(Post, 'id')
+        Group.objects.create(title='Новая', slug='new-group',
+                             description='Описание')
+        self.assertTrue(
+            lookup_filter.might_exist(Group, 'slug', 'new-group'))
+        self.assertIs(lookup_filter.current(Post, 'id'), posts)
+
+    def test_404_path_is_escaped(self):
+        """Адрес в кешированной странице 404 экранируется."""
+        response = self.client.get('/profile/<b>/')
+        self.assertNotContains(response, '<b>', status_code=404)
+
+
+class CachedAuthTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Reader')
+        self.client.force_login(self.user)
+
+    def test_user_comes_from_cache(self):
+        """Авторизованный запрос читает из базы только сессию."""
+        self.client.get('/about/author/')
+        with self.assertNumQueries(1):
+            response = self.client.get('/about/author/')
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_model_backend_sessions_stay_valid(self):
+        """Сессии, созданные с ModelBackend, не разлогиниваются."""
+        self.client.force_login(
+            self.user, backend='django.contrib.auth.backends.ModelBackend')
+        response = self.client.get('/about/author/')
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_deactivated_user_is_logged_out(self):
+        """Сохранение пользователя сбрасывает его запись в кеше."""
+        self.client.get('/about/author/')
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get('/about/author/')
+        self.assertFalse(response.context['user'].is_authenticated)
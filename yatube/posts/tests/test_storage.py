@@ -0,0 +1,220 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from core import metrics
+from core.disk_cache import DiskCache
+from posts import image_transforms
+from posts.models import Post
+from posts.presenters import present_posts
+from posts.storage import content_storage
+from posts.thumbnails import ThumbnailBackend
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='Author')
+
+    def create_post(self, filename):
+        return Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(filename, SMALL_GIF, 'image/gif'),
+        )
+
+    def test_same_upload_is_stored_once(self):
+        """Одинаковые картинки хранятся одним файлом."""
+        first = self.create_post('first.gif')
+        second = self.create_post('second.GIF')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.startswith('posts/'))
+        self.assertTrue(first.image.name.endswith('.gif'))
+        self.assertTrue(content_storage.exists(first.image.name))
+
+    def test_repeated_upload_refreshes_mtime(self):
+        """Повторная загрузка продлевает срок защиты файла от gc_images."""
+        name = self.create_post('old.gif').image.name
+        path = content_storage.path(name)
+        os.utime(path, (0, 0))
+        self.create_post('new.gif')
+        self.assertGreater(os.path.getmtime(path), 0)
+
+    def test_gc_removes_unreferenced_images(self):
+        """gc_images удаляет только картинки без постов."""
+        post = self.create_post('kept.gif')
+        orphan = content_storage.save('posts/orphan.txt',
+                                      SimpleUploadedFile('o.txt', b'x'))
+        call_command('gc_images', grace=0, stdout=StringIO())
+        self.assertTrue(content_storage.exists(post.image.name))
+        self.assertFalse(os.path.exists(content_storage.path(orphan)))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailBatchTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(username='Author')
+        for color in ('red', 'green', 'blue'):
+            content = BytesIO()
+            Image.new('RGB', (4, 4), color).save(content, 'PNG')
+            Post.objects.create(
+                author=user,
+                text=f'Пост {color}',
+                image=SimpleUploadedFile(f'{color}.png', content.getvalue(),
+                                         'image/png'),
+            )
+        Post.objects.create(author=user, text='Пост без картинки')
+
+    def test_page_thumbnails_are_read_in_one_query(self):
+        """Миниатюры страницы читаются из хранилища sorl одним запросом."""
+        posts = Post.objects.select_related('author', 'group')
+        urls = [card.thumbnail_url for card in present_posts(posts)]
+        cache.clear()
+        with self.assertNumQueries(1):
+            cards = present_posts(list(posts))
+        self.assertEqual([card.thumbnail_url for card in cards], urls)
+        self.assertEqual(len(set(urls) - {None}), 3)
+
+    def test_broken_image_keeps_other_thumbnails(self):
+        """Ошибка миниатюры одной картинки не лишает миниатюр остальные."""
+        broken = Post.objects.get(text='Пост red').image.name
+        original = ThumbnailBackend.get_thumbnail
+
+        def get_thumbnail(backend, file_, *args, **kwargs):
+            if file_.name == broken:
+                raise OSError('No space left on device')
+            return original(backend, file_, *args, **kwargs)
+
+        posts = Post.objects.select_related('author', 'group')
+        with mock.patch.object(ThumbnailBackend, 'get_thumbnail',
+                               get_thumbnail), \
+                self.assertLogs('posts.thumbnails', 'ERROR'):
+            cards = present_posts(posts)
+        urls = {card.text: card.thumbnail_url for card in cards}
+        self.assertIsNone(urls['Пост red'])
+        self.assertIsNotNone(urls['Пост green'])
+        self.assertIsNotNone(urls['Пост blue'])
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT,
+                   IMAGE_CACHE_ROOT=os.path.join(TEMP_MEDIA_ROOT, 'cache'))
+class ImageTransformTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(settings.IMAGE_CACHE_ROOT, ignore_errors=True)
+        content = BytesIO()
+        Image.new('RGB', (64, 32), 'red').save(content, 'PNG')
+        self.post = Post.objects.create(
+            author=User.objects.create_user(username='Author'),
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('red.png', content.getvalue(),
+                                     'image/png'),
+        )
+
+    def test_signed_url_returns_resized_image(self):
+        """По подписанному адресу отдаётся картинка нужного размера."""
+        url = image_transforms.image_url(self.post.id, 16, 16, ext='png')
+        counters = ('generated', 'cached')
+        before = metrics.read('image_transforms', counters)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        image = Image.open(BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(image.size, (16, 16))
+        self.client.get(url)
+        after = metrics.read('image_transforms', counters)
+        self.assertEqual(
+            {counter: after[counter] - before[counter]
+             for counter in counters},
+            {'generated': 1, 'cached': 1})
+
+    def test_file_evicted_before_open_is_regenerated(self):
+        """Файл, вытесненный сразу после поиска в кеше, строится заново."""
+        url = image_transforms.image_url(self.post.id, 16, 16, ext='png')
+        self.client.get(url)
+        original = DiskCache.get
+
+        def evicted_get(disk_cache, key):
+            path = original(disk_cache, key)
+            if path is not None:
+                os.remove(path)
+            return path
+
+        with mock.patch.object(DiskCache, 'get', evicted_get):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    def test_missing_source_image_is_not_found(self):
+        """Если исходник удалён, адрес отвечает 404, а не ошибкой."""
+        self.post.image.storage.delete(self.post.image.name)
+        url = image_transforms.image_url(self.post.id, 16, 16, ext='png')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 404)
+
+    def test_image_meta_is_stored_on_upload(self):
+        """При загрузке сохраняются размеры, цвет и заглушка картинки."""
+        self.assertEqual((self.post.image_width, self.post.image_height),
+                         (64, 32))
+        self.assertEqual(self.post.image_color, '#ff0000')
+        self.assertTrue(
+            self.post.image_placeholder.startswith('data:image/jpeg;base64,'))
+        response = self.client.get(f'/posts/{self.post.id}/')
+        self.assertContains(response, 'width="960" height="339"')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, self.post.image_placeholder)
+
+    def test_tampered_url_is_rejected(self):
+        """Адрес с чужим размером и старой подписью даёт 404."""
+        url = image_transforms.image_url(self.post.id, 16, 16)
+        response = self.client.get(url.replace('16x16', '2000x2000'))
+        self.assertEqual(response.status_code, 404)
+
+    def test_disk_cache_evicts_least_recently_read(self):
+        """Дисковый кеш удаляет давно не читавшиеся файлы."""
+        disk_cache = DiskCache(os.path.join(TEMP_MEDIA_ROOT, 'lru'), 250)
+        disk_cache.set('aa-old', b'x' * 100)
+        disk_cache.set('bb-read', b'x' * 100)
+        os.utime(disk_cache.path('aa-old'), ns=(0, 0))
+        disk_cache.get('bb-read')
+        disk_cache.set('cc-new', b'x' * 100)
+        self.assertIsNone(disk_cache.get('aa-old'))
+        self.assertIsNotNone(disk_cache.get('bb-read'))
+        self.assertIsNotNone(disk_cache.get('cc-new'))
@@ -2,9 +2,12 @@ from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.template import Context, Template
 from django.test import TestCase, Client
+from django.urls import reverse
 
 from posts.models import Group, Post
+from posts.url_builder import fast_url
 
 User = get_user_model()
 
@@ -85,3 +88,25 @@ class PostURLTests(TestCase):
 
     def tearDown(self):
         cache.clear()
+
+
+class FastUrlTests(TestCase):
+    def test_fast_url_matches_reverse(self):
+        """fast_url строит те же адреса, что и reverse()."""
+        routes = (
+            ('posts:index', ()),
+            ('posts:profile', ('Лев.Толстой@1',)),
+            ('posts:post_detail', (42,)),
+            ('posts:group_posts', ('test-slug',)),
+            ('posts:profile_follow', ('user+name',)),
+        )
+        for viewname, args in routes:
+            with self.subTest(viewname=viewname):
+                self.assertEqual(fast_url(viewname, *args),
+                                 reverse(viewname, args=args))
+
+    def test_template_tag(self):
+        """Тег fast_url в шаблоне."""
+        template = Template(
+            "{% load post_urls %}{% fast_url 'posts:post_detail' pk %}")
+        self.assertEqual(template.render(Context({'pk': 7})), '/posts/7/')
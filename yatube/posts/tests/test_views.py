@@ -1,10 +1,19 @@
+from io import StringIO
+from unittest import mock
+
 from django import forms
 from django.contrib.auth import get_user_model
-from django.core.cache import cache
-from django.test import Client, TestCase
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from posts.models import Post, Group, Follow
+from core import jobs
+from posts import feed_cache, follow_graph, lookup_filter
+from posts.models import Post, Group, Follow, FollowSummary
+from posts.presenters import present_posts
 
 User = get_user_model()
 NUM_POSTS = 10
@@ -276,3 +285,226 @@ class PaginatorViewsTest(TestCase):
             'posts:profile', kwargs={'username': self.author}) + '?page=2')
         self.assertEqual(len(response.context['page_obj']),
                          self.POST_NUM - NUM_POSTS)
+
+
+class FollowGraphTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='Reader')
+        self.author = User.objects.create_user(username='Writer')
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_graph_follows_subscriptions(self):
+        """Кеш подписок обновляется при подписке и отписке."""
+        self.assertFalse(
+            follow_graph.is_following(self.user.id, self.author.id))
+        self.client.get(reverse('posts:profile_follow',
+                                kwargs={'username': self.author.username}))
+        self.assertTrue(
+            follow_graph.is_following(self.user.id, self.author.id))
+        self.assertEqual(list(follow_graph.followees(self.user.id)),
+                         [self.author.id])
+        self.assertEqual(follow_graph.follower_count(self.author.id), 1)
+        self.client.get(reverse('posts:profile_unfollow',
+                                kwargs={'username': self.author.username}))
+        self.assertFalse(
+            follow_graph.is_following(self.user.id, self.author.id))
+        self.assertEqual(follow_graph.follower_count(self.author.id), 0)
+
+    def test_profile_reads_graph_from_cache(self):
+        """Профиль не обращается к Follow, если граф уже в кеше."""
+        Follow.objects.create(user=self.user, author=self.author)
+        follow_graph.followees(self.user.id)
+        lookup_filter.current(User, 'username')
+        url = reverse('posts:profile',
+                      kwargs={'username': self.author.username})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertTrue(response.context['following'])
+        self.assertFalse(any('"posts_follow"' in query['sql']
+                             for query in queries.captured_queries))
+
+    def test_graph_is_shared_between_processes(self):
+        """Подписка, сохранённая другим процессом, видна сразу."""
+        follow_graph.followees(self.user.id)
+        # Сохранение в другом процессе не трогает кеш этого процесса.
+        with mock.patch.object(cache, 'delete_many'):
+            Follow.objects.create(user=self.user, author=self.author)
+        self.assertTrue(
+            follow_graph.is_following(self.user.id, self.author.id))
+
+
+class FollowSummaryTests(TestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f'user{i}')
+                      for i in range(4)]
+        first, second, third, fourth = self.users
+        for user, author in ((first, second), (second, third),
+                             (second, fourth), (third, fourth)):
+            Follow.objects.create(user=user, author=author)
+
+    def test_build_follow_summary(self):
+        """Команда считает подписки и рекомендует друзей друзей."""
+        call_command('build_follow_summary', chunk_size=2, stdout=StringIO())
+        first, second, third, fourth = self.users
+        summary = FollowSummary.objects.get(user=fourth)
+        self.assertEqual(summary.followers_count, 2)
+        self.assertEqual(summary.following_count, 0)
+        summary = FollowSummary.objects.get(user=first)
+        self.assertEqual(summary.following_count, 1)
+        self.assertEqual(summary.suggested_ids, [third.id, fourth.id])
+
+    def test_profile_shows_summary(self):
+        """Профиль показывает счётчики и рекомендации из FollowSummary."""
+        call_command('build_follow_summary', stdout=StringIO())
+        client = Client()
+        client.force_login(self.users[0])
+        response = client.get(reverse(
+            'posts:profile', kwargs={'username': self.users[0].username}))
+        self.assertEqual(response.context['summary'].following_count, 1)
+        self.assertEqual(list(response.context['suggestions']),
+                         [self.users[2], self.users[3]])
+
+    def test_suggestions_keep_rank_order(self):
+        """Рекомендации выводятся в порядке ранга, а не id."""
+        first, second, third, fourth = self.users
+        FollowSummary.objects.create(
+            user=first, suggestions=f'{fourth.id},{second.id},{third.id}')
+        client = Client()
+        client.force_login(first)
+        response = client.get(reverse(
+            'posts:profile', kwargs={'username': first.username}))
+        self.assertEqual(list(response.context['suggestions']),
+                         [fourth, second, third])
+
+
+class PresenterTests(TestCase):
+    def setUp(self):
+        self.group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Описание группы',
+            slug='test-slug'
+        )
+        self.author = User.objects.create_user(
+            username='Автор', first_name='Лев', last_name='Толстой')
+        Post.objects.create(author=self.author, text='Без группы')
+        self.post = Post.objects.create(
+            author=self.author, text='С группой', group=self.group)
+
+    def test_cards_match_reverse(self):
+        """Готовые ссылки карточек совпадают с reverse()."""
+        posts = Post.objects.select_related('author', 'group')
+        with self.assertNumQueries(1):
+            cards = present_posts(posts)
+        card = cards[0]
+        self.assertEqual(card.pk, self.post.pk)
+        self.assertEqual(card.author_name, 'Лев Толстой')
+        self.assertEqual(card.profile_url, reverse(
+            'posts:profile', args=[self.author.username]))
+        self.assertEqual(card.detail_url, reverse(
+            'posts:post_detail', args=[self.post.pk]))
+        self.assertEqual(card.group_url, reverse(
+            'posts:group_posts', args=[self.group.slug]))
+        self.assertIsNone(cards[1].group_url)
+        self.assertIsNone(card.thumbnail_url)
+
+
+class FeedCacheTests(TransactionTestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username='Reader')
+        self.author = User.objects.create_user(username='Writer')
+        self.other = User.objects.create_user(username='Other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.force_login(self.reader)
+        self.url = reverse('posts:follow_index')
+
+    def tearDown(self):
+        cache.clear()
+        caches['shared'].clear()
+        feed_cache.pages.clear()
+
+    def test_page_is_cached_per_user(self):
+        """Повторный запрос ленты отдаётся из кеша без рендера."""
+        self.client.get(self.url)
+        Post.objects.create(author=self.other, text='Чужой пост')
+        response = self.client.get(self.url)
+        self.assertIsNone(response.context)
+
+    def test_followed_author_post_invalidates(self):
+        """Новый пост автора из подписок сбрасывает кеш ленты."""
+        self.client.get(self.url)
+        Post.objects.create(author=self.author, text='Новый пост')
+        jobs.run_pending()
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Новый пост')
+
+    def test_follow_change_invalidates(self):
+        """Новая подписка сбрасывает кеш ленты."""
+        Post.objects.create(author=self.other, text='Пост другого')
+        self.client.get(self.url)
+        Follow.objects.create(user=self.reader, author=self.other)
+        self.assertContains(self.client.get(self.url), 'Пост другого')
+
+
+class IndexFragmentsTests(TestCase):
+    def setUp(self):
+        self.first = User.objects.create_user(username='FirstReader')
+        self.second = User.objects.create_user(username='SecondReader')
+        self.author = User.objects.create_user(username='Writer')
+        Post.objects.create(author=self.author, text='Пост')
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_shared_page_with_personal_header(self):
+        """Главная кешируется одна на всех, шапка своя у каждого."""
+        client = Client()
+        client.force_login(self.first)
+        self.assertContains(client.get(reverse('posts:index')),
+                            'FirstReader')
+        Post.objects.create(author=self.author, text='Новый пост')
+        client.force_login(self.second)
+        response = client.get(reverse('posts:index'))
+        self.assertNotIn('page_obj', response.context)
+        self.assertContains(response, 'SecondReader')
+        self.assertNotContains(response, 'FirstReader')
+        self.assertNotContains(response, 'Новый пост')
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, 'Войти')
+        self.assertNotContains(response, 'Новая запись')
+
+
+class WarmupTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='Author')
+        self.group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Описание группы',
+            slug='test-slug'
+        )
+        Post.objects.create(author=self.author, text='Пост',
+                            group=self.group)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_warmup_skips_process_local_cache(self):
+        """Без --base-url страницы в кеш процесса не рендерятся."""
+        out = StringIO()
+        call_command('warmup', pages=2, workers=0, stdout=out,
+                     stderr=StringIO())
+        self.assertIn('Страниц: 0 из 2', out.getvalue())
+        response = self.client.get(reverse('posts:index'))
+        self.assertIn('page_obj', response.context)
+
+    def test_warmup_fills_index_cache(self):
+        """warmup рендерит страницы и заполняет общий кеш главной."""
+        out = StringIO()
+        with mock.patch('posts.management.commands.warmup.'
+                        'pages_cache_is_shared', return_value=True):
+            call_command('warmup', pages=2, workers=0, stdout=out)
+        self.assertIn('Страниц: 2 из 2', out.getvalue())
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('page_obj', response.context)
@@ -0,0 +1,79 @@
+"""Пакетное чтение миниатюр sorl-thumbnail.
+
+Обычный get_thumbnail ходит в хранилище ключей sorl за каждой
+картинкой отдельно. get_thumbnails сначала вычисляет имена всех
+миниатюр страницы, читает их одним get_many из кеша и недостающие
+одним запросом к базе; get_thumbnail вызывается только для миниатюр,
+которых ещё нет в хранилище.
+"""
+import logging
+
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend as BaseBackend
+from sorl.thumbnail.conf import defaults as default_settings, settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import (
+    EMPTY_VALUE, KVStore as BaseKVStore)
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+logger = logging.getLogger(__name__)
+
+
+class KVStore(BaseKVStore):
+    def get_many(self, image_files):
+        """Записи для image_files в том же порядке, None для отсутствующих."""
+        keys = [add_prefix(image_file.key) for image_file in image_files]
+        values = self.cache.get_many(keys)
+        missing = [key for key in keys if key not in values]
+        if missing:
+            found = dict(KVStoreModel.objects.filter(
+                key__in=missing).values_list('key', 'value'))
+            loaded = {key: found.get(key, EMPTY_VALUE) for key in missing}
+            self.cache.set_many(loaded, settings.THUMBNAIL_CACHE_TIMEOUT)
+            values.update(loaded)
+        return [
+            None if values[key] in (EMPTY_VALUE, None, '')
+            else deserialize_image_file(values[key])
+            for key in keys
+        ]
+
+
+class ThumbnailBackend(BaseBackend):
+    def thumbnail_file(self, file_, geometry_string, **options):
+        """Миниатюра, которую вернул бы get_thumbnail, без её создания."""
+        source = ImageFile(file_)
+        if settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def get_thumbnails(self, files, geometry_string, **options):
+        """Миниатюры для списка файлов за один проход по хранилищу.
+
+        Вместо миниатюры, которую не удалось построить, в списке None:
+        одна битая картинка не лишает миниатюр остальные.
+        """
+        thumbnails = [
+            self.thumbnail_file(file_, geometry_string, **options)
+            for file_ in files
+        ]
+        cached = default.kvstore.get_many(thumbnails)
+        return [
+            thumbnail or self.build_thumbnail(file_, geometry_string,
+                                              **options)
+            for file_, thumbnail in zip(files, cached)
+        ]
+
+    def build_thumbnail(self, file_, geometry_string, **options):
+        try:
+            return self.get_thumbnail(file_, geometry_string, **options)
+        except Exception:
+            logger.exception('Thumbnail for %s failed', file_)
+            return None
@@ -6,11 +6,13 @@ from . import views
 app_name = 'posts'
 
 urlpatterns = [
-    path('', views.index, name='start_page'),
+    path('groups/', views.group_index, name='group_index'),
     path('group/<slug:slug>/', views.group_posts, name='group_posts'),
     path('', views.index, name='index'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('posts/<int:post_id>/image/<str:signature>/<str:spec>',
+         views.post_image, name='post_image'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('posts/<int:post_id>/comment/',
@@ -1,17 +1,29 @@
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.http import Http404
 from django.shortcuts import render, get_object_or_404, redirect
-from django.views.decorators.cache import cache_page
 
-from .models import Post, Group, User, Comment, Follow
+from core import media
+from core.fragments import cache_page_with_fragments
+
+from . import follow_graph, image_transforms, lookup_filter, object_cache
+from .feed_cache import cache_user_feed
+from .models import ArchivedPost, Follow, FollowSummary, Group, Post, User
 from .forms import PostForm, CommentForm
+from .presenters import (THUMBNAIL_HEIGHT, THUMBNAIL_WIDTH, present_posts,
+                         thumbnail_url)
 
 
 NUM_POSTS = 10
 CACHE_NUM = 20
+STALE_NUM = 60
+# SQLite ограничивает число параметров запроса, большие списки
+# авторов передаются в ленту подзапросом.
+MAX_AUTHOR_IDS = 900
 
 
-@cache_page(CACHE_NUM, key_prefix='index_page')
+@cache_page_with_fragments(CACHE_NUM, key_prefix='index_page',
+                           stale_timeout=STALE_NUM)
 def index(request):
     post_list = Post.objects.select_related('author', 'group').all()
     paginator = Paginator(post_list, NUM_POSTS)
@@ -19,69 +31,134 @@ def index(request):
     page_obj = paginator.get_page(page_number)
     context = {
         'page_obj': page_obj,
+        'cards': present_posts(page_obj),
     }
     return render(request, 'posts/index.html', context)
 
 
+def group_index(request):
+    groups = Group.objects.order_by('-last_post_at')
+    paginator = Paginator(groups, NUM_POSTS)
+    page_number = request.GET.get('page')
+    page_obj = paginator.get_page(page_number)
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/group_index.html', context)
+
+
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    group = object_cache.get_or_404(Group, 'slug', slug)
+    posts = Post.objects.with_archive(group=group)
     paginator = Paginator(posts, NUM_POSTS)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     context = {
         'group': group,
         'page_obj': page_obj,
+        'cards': present_posts(page_obj),
     }
     return render(request, 'posts/group_list.html', context)
 
 
 def profile(request, username):
-    username = get_object_or_404(User, username=username)
-    user_posts = Post.objects.filter(author=username)
+    username = object_cache.get_or_404(User, 'username', username)
+    user_posts = Post.objects.with_archive(author=username)
     post_count = user_posts.count()
     paginator = Paginator(user_posts, NUM_POSTS)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
-    following = (request.user.is_authenticated
-                 and username.following.filter(user=request.user).exists())
+    cards = present_posts(page_obj)
+    summary = FollowSummary.objects.filter(user=username).first()
     if username == request.user:
         context = {
             'username': username,
             'page_obj': page_obj,
+            'cards': cards,
             'post_count': post_count,
+            'summary': summary,
+            'suggestions': suggestions(summary),
         }
         return render(request, 'posts/profile.html', context)
-    if username.DoesNotExist and not following:
-        following = False
-    else:
-        following = Follow.objects.filter(
-            user=request.user,
-            author=username.id
-        ).exists()
+    following = (request.user.is_authenticated
+                 and follow_graph.is_following(request.user.id, username.id))
     context = {
         'username': username,
         'page_obj': page_obj,
+        'cards': cards,
         'post_count': post_count,
+        'summary': summary,
         'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+def suggestions(summary):
+    if summary is None:
+        return []
+    users = object_cache.get_many(User, 'id', summary.suggested_ids)
+    return [users[user_id] for user_id in summary.suggested_ids
+            if user_id in users]
+
+
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    if not lookup_filter.might_exist(Post, 'id', post_id):
+        raise Http404('No Post matches the given query.')
+    post = object_cache.get(Post, 'id', post_id)
+    archived = post is None
+    if archived:
+        post = get_object_or_404(ArchivedPost, id=post_id)
+    else:
+        post.author = object_cache.get(User, 'id', post.author_id)
+        if post.group_id is not None:
+            post.group = object_cache.get(Group, 'id', post.group_id)
     posts = post.author.posts.count()
     form = CommentForm(request.POST or None)
-    comments = Comment.objects.filter(post=post)
+    comments = post.comments.all()
     context = {
         'post': post,
         'posts': posts,
         'form': form,
         'comments': comments,
+        'archived': archived,
+        'thumbnail_url': thumbnail_url(post.image),
+        'thumbnail_width': THUMBNAIL_WIDTH,
+        'thumbnail_height': THUMBNAIL_HEIGHT,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def _transformed_path_or_404(image, spec):
+    try:
+        return image_transforms.transformed_path(image, spec)
+    except FileNotFoundError:
+        # Исходник удалён, например командой gc_images.
+        raise Http404('Image file is missing.')
+
+
+def post_image(request, post_id, signature, spec):
+    if not image_transforms.check_signature(post_id, spec, signature):
+        raise Http404('Bad image signature.')
+    try:
+        spec = image_transforms.parse_spec(spec)
+    except ValueError:
+        raise Http404('Bad image spec.')
+    post = object_cache.get(Post, 'id', post_id)
+    if post is None:
+        post = get_object_or_404(ArchivedPost, id=post_id)
+    if not post.image:
+        raise Http404('Post has no image.')
+    path = _transformed_path_or_404(post.image, spec)
+    try:
+        return media.serve_file(request, path,
+                                content_type=spec.content_type)
+    except FileNotFoundError:
+        # Файл вытеснили из кеша между поиском и открытием: это промах.
+        return media.serve_file(
+            request, _transformed_path_or_404(post.image, spec),
+            content_type=spec.content_type)
+
+
 def post_create(request):
     form = PostForm(request.POST or None)
     if request.method == 'POST':
@@ -98,7 +175,9 @@ def post_create(request):
 
 
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    # Не из кеша: save() перезапишет все поля, в том числе изменённые
+    # через update() после того, как пост попал в кеш.
+    post = get_object_or_404(Post, pk=post_id)
     form = PostForm(request.POST or None,
                     files=request.FILES or None,
                     instance=post)
@@ -118,7 +197,7 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
@@ -129,21 +208,28 @@ def add_comment(request, post_id):
 
 
 @login_required
+@cache_user_feed
 def follow_index(request):
-    authors = request.user.follower.values('author')
-    posts_list = Post.objects.filter(author__in=authors)
+    authors = follow_graph.followees(request.user.id)
+    if len(authors) > MAX_AUTHOR_IDS:
+        authors = request.user.follower.values('author')
+    else:
+        authors = list(authors)
+    posts_list = Post.objects.filter(
+        author__in=authors).select_related('author', 'group')
     paginator = Paginator(posts_list, NUM_POSTS)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     context = {
         'page_obj': page_obj,
+        'cards': present_posts(page_obj),
     }
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = object_cache.get_or_404(User, 'username', username)
     if author != request.user:
         Follow.objects.get_or_create(
             user=request.user,
@@ -154,7 +240,7 @@ def profile_follow(request, username):
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = object_cache.get_or_404(User, 'username', username)
     following = Follow.objects.filter(
         user=request.user,
         author=author
@@ -0,0 +1,17 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from posts import object_cache
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, берущий пользователя сессии из кеша объектов.
+
+    Запись сбрасывается при сохранении пользователя (смена пароля,
+    last_login, блокировка) в этом процессе, а в остальных истекает
+    через posts.object_cache.USER_TIMEOUT.
+    """
+
+    def get_user(self, user_id):
+        user = object_cache.get(get_user_model(), 'id', user_id)
+        return user if user and self.user_can_authenticate(user) else None
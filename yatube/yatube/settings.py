@@ -27,11 +27,50 @@ DEBUG = True
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
-
+# 'X-Sendfile' (Apache) или 'X-Accel-Redirect' (nginx): файлы медиа
+# отдаёт веб-сервер, Django только проверяет запрос и ставит заголовки.
+MEDIA_SENDFILE_HEADER = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# 'default' — кеш процесса для данных, которым допустимо устареть на
+# время их таймаута. 'shared' — общий для всех процессов кеш для меток
+# сброса (поколения лент, новые имена для posts.lookup_filter); таблицу
+# создаёт миграция core 0003, в продакшене его можно заменить на
+# memcached.
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'core_shared_cache',
+        # При переполнении таблица чистится по порядку ключей, а не по
+        # давности, и удаляет бессрочные метки лент и записи журналов.
+        'OPTIONS': {'MAX_ENTRIES': 1000000},
+    },
+}
+
+# Бюджет памяти процесса под кеш лент подписок (posts.feed_cache) и
+# срок жизни страницы в нём
+FEED_CACHE_MAX_BYTES = 32 * 1024 * 1024
+FEED_CACHE_TIMEOUT = 60
+
+# Миниатюры страницы читаются из хранилища sorl одним запросом
+# (posts.thumbnails)
+THUMBNAIL_BACKEND = 'posts.thumbnails.ThumbnailBackend'
+THUMBNAIL_KVSTORE = 'posts.thumbnails.KVStore'
+
+# Дисковый кеш картинок нужного размера (posts.image_transforms)
+IMAGE_CACHE_ROOT = os.path.join(BASE_DIR, 'image_cache')
+IMAGE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+RATELIMIT_STORAGE = 'core.ratelimit.CacheStorage'
+RATELIMIT_CACHE = 'shared'
+RATELIMITS = {
+    'posts:post_create': {'rate': '10/m', 'methods': ['POST']},
+    'posts:add_comment': {'rate': '20/m', 'methods': ['POST']},
+    'posts:profile_follow': {'rate': '30/m'},
+    'users:signup': {'rate': '5/h', 'key': 'ip', 'methods': ['POST']},
 }
 
 ALLOWED_HOSTS = [
@@ -60,10 +99,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -71,14 +112,21 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+STATICFILES_STORAGE = 'core.staticfiles.CompressedManifestStaticFilesStorage'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -90,6 +138,9 @@ TEMPLATES = [
     },
 ]
 
+# Компилировать шаблоны из TEMPLATES_DIR при старте (см. core.apps)
+PRECOMPILE_TEMPLATES = True
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
@@ -154,9 +205,23 @@ DATABASES = {
     }
 }
 
+# Пользователь запроса читается из кеша объектов (posts.object_cache) с
+# коротким таймаутом: кеш 'default' у каждого процесса свой, и другой
+# процесс узнает о смене пароля или блокировке не позже чем через
+# USER_TIMEOUT. Сессии остаются в базе: выход из аккаунта должен сразу
+# действовать во всех процессах. cached_db включать только при общем
+# бэкенде 'default'. ModelBackend оставлен для сессий, созданных с ним.
+AUTHENTICATION_BACKENDS = [
+    'users.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма сохраняются в очередь и уходят задачей core.jobs через
+# EMAIL_DELIVERY_BACKEND (core.mail)
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+EMAIL_DELIVERY_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')